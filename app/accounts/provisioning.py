@@ -0,0 +1,122 @@
+"""
+Bulk provisioning of a creator's managers and technicians.
+
+Rows come from CSV (with a header line) or JSON and hold ``email``,
+``first_name``, ``last_name``, ``branch``, ``password`` and ``role``
+(``manager`` by default, or ``technician``). Hashing the passwords is
+nearly all of the work, so it is spread over a process pool; the users
+and the creator's manager links are then inserted with one ``bulk_create``
+each instead of a ``create_user`` and an ``assign_manager`` per row.
+"""
+import csv
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from core.cache import bump_version
+from core.models import OrganizationClosure, User
+
+from .serializers import ProvisionUserSerializer
+
+PROVISION_FORMATS = ('csv', 'json')
+
+
+def read_rows(text, fmt):
+    """Parse CSV or JSON ``text`` into a list of row dicts; raise ValueError if malformed."""
+    if fmt == 'csv':
+        # Empty cells count as missing, so optional columns may be left blank.
+        return [
+            {column: value for column, value in row.items() if value}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+    rows = json.loads(text)
+    if isinstance(rows, dict):
+        rows = rows.get('users')
+    if not isinstance(rows, list):
+        raise ValueError('Expected a JSON list of users.')
+    return rows
+
+
+def hash_passwords(passwords):
+    """Return ``make_password`` of every password, hashed in parallel processes."""
+    if len(passwords) < 2 or settings.PASSWORD_HASH_WORKERS < 2:
+        return [make_password(password) for password in passwords]
+    workers = min(settings.PASSWORD_HASH_WORKERS, len(passwords))
+    chunksize = -(-len(passwords) // (workers * 4))
+    # Spawned (not forked) workers need Django set up to read the hasher settings.
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def provision_users(creator, rows):
+    """
+    Create the users described by ``rows`` for ``creator``.
+
+    Managers are assigned to the creator; technicians are created on their
+    own, as through the sign-up endpoint. Returns one result per row, in
+    order, with ``status`` ``created`` or ``invalid``.
+    """
+    results = [None] * len(rows)
+    valid = {}
+    for index, row in enumerate(rows):
+        serializer = ProvisionUserSerializer(data=row)
+        if not serializer.is_valid():
+            results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+        elif serializer.validated_data['email'] in valid:
+            errors = {'email': ['Appears more than once in this batch.']}
+            results[index] = {'index': index, 'status': 'invalid', 'errors': errors}
+        else:
+            valid[serializer.validated_data['email']] = (index, serializer.validated_data)
+
+    for email in User.objects.filter(email__in=list(valid)).values_list('email', flat=True):
+        index, _ = valid.pop(email)
+        errors = {'email': ['A user with this email already exists.']}
+        results[index] = {'index': index, 'status': 'invalid', 'errors': errors}
+
+    if not valid:
+        return results
+
+    rows = list(valid.values())
+    hashes = hash_passwords([data['password'] for _, data in rows])
+    users = [
+        User(
+            email=data['email'],
+            first_name=data['first_name'],
+            last_name=data['last_name'],
+            branch=data.get('branch'),
+            company=creator.company,
+            password=password,
+            is_technique=data['role'] == 'technician',
+        )
+        for (_, data), password in zip(rows, hashes)
+    ]
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=settings.PROVISION_BATCH_SIZE)
+        # MySQL does not return the keys of bulk inserted rows.
+        ids = dict(User.objects.filter(email__in=list(valid)).values_list('email', 'pk'))
+        managers = [ids[data['email']] for _, data in rows if data['role'] == 'manager']
+        if managers:
+            User.managers.through.objects.bulk_create(
+                [User.managers.through(from_user_id=creator.pk, to_user_id=pk) for pk in managers],
+                batch_size=settings.PROVISION_BATCH_SIZE,
+            )
+            OrganizationClosure.objects.rebuild_for(managers)
+            creator.touch()
+        # bulk_create sends no post_save, so refresh the search index here.
+        bump_version('user-search', 'all')
+
+    for index, data in rows:
+        results[index] = {
+            'index': index,
+            'status': 'created',
+            'id': ids[data['email']],
+            'email': data['email'],
+            'role': data['role'],
+        }
+    return results
@@ -1,3 +1,5 @@
+from operator import itemgetter
+
 from django.contrib.auth import (
     get_user_model
 )
@@ -7,19 +9,75 @@ from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 from rest_framework import serializers
-from django.db.models import Count
+from rest_framework.relations import MANY_RELATION_KWARGS
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
-from core.models import Rating, Register, WorkRequest, User
+from core.fieldsets import SparseFieldsetMixin, media_url
+from core.models import Rating, WorkRequest, User
+from core.renditions import rendition_urls
+
+def annotate_user_list(users, request):
+    """Annotate and prefetch what UserSerializer reads, so listed rows cost no queries."""
+    users = users.prefetch_related('managers')
+    if request.user.is_creator:
+        return users.annotate(
+            managers_registers_count=Coalesce(Sum('descendant_links__descendant__registers_count'), 0)
+        )
+    return users
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """ManyRelatedField loading every submitted primary key with a single query."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pks = []
+        for item in data:
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(queryset.model._meta.pk.to_python(item))
+            except (TypeError, ValueError, DjangoValidationError):
+                child.fail('incorrect_type', data_type=type(item).__name__)
+
+        found = queryset.in_bulk(pks)
+        for pk in pks:
+            if pk not in found:
+                child.fail('does_not_exist', pk_value=pk)
+        return [found[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField whose ``many=True`` form validates in one query."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    managers = BulkPrimaryKeyRelatedField(many=True, queryset=User.objects.all(), required=False)
     registers_count = serializers.SerializerMethodField()
     average_rating = serializers.FloatField(read_only=True)
+    image_thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = get_user_model()
         fields = [
             'id', 'email', 'password', 'first_name', 'last_name', 'company',
-            'branch', 'image', 'is_creator', 'is_technique', 'is_active', 
+            'branch', 'image', 'image_thumbnails', 'is_creator', 'is_technique', 'is_active', 
             'is_staff', 'managers', 'registers_count', 'average_rating'
         ]
         extra_kwargs = {
@@ -51,8 +109,8 @@ class UserSerializer(serializers.ModelSerializer):
             user.is_technique=True
             user.save()
 
-        for manager in managers_data:
-            user.assign_manager(manager)
+        if managers_data:
+            user.set_managers(managers_data)
         
         return user
     
@@ -61,16 +119,14 @@ class UserSerializer(serializers.ModelSerializer):
         managers_data = validated_data.pop('managers', None)
         password = validated_data.pop('password', None)
 
-        user = super().update(instance, validated_data)
-
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
+
+        user = super().update(instance, validated_data)
 
         if managers_data is not None:
-            user.managers.clear()
-            for manager in managers_data:
-                user.assign_manager(manager)
+            # The user was just saved, so set_managers need not touch it.
+            user.set_managers(managers_data)
         
         return user
 
@@ -82,10 +138,39 @@ class UserSerializer(serializers.ModelSerializer):
             return 0
 
         if user.is_creator:
-            total_count = Register.objects.filter(owner__in=obj.managers.all()).count()
-            return total_count
+            if hasattr(obj, 'managers_registers_count'):
+                return obj.managers_registers_count
+            under = User.objects.filter(ancestor_links__ancestor=obj)
+            return under.aggregate(total=Sum('registers_count'))['total'] or 0
 
-        return Register.objects.filter(owner=obj).count()
+        return obj.registers_count
+
+    def get_image_thumbnails(self, obj):
+        return rendition_urls(obj.image, 'user')
+
+    @classmethod
+    def values_fields(cls, context):
+        plain = (
+            'id', 'email', 'first_name', 'last_name', 'company', 'branch',
+            'is_creator', 'is_technique', 'is_active', 'is_staff',
+        )
+        fields = {name: ((name,), itemgetter(name)) for name in plain}
+        fields['image'] = (('image',), lambda row: media_url(row['image'], context))
+        fields['image_thumbnails'] = (('image',), lambda row: rendition_urls(row['image'], 'user'))
+        fields['average_rating'] = (
+            ('is_technique', 'rating_sum', 'rating_count'),
+            lambda row: row['rating_sum'] / row['rating_count'] if row['is_technique'] and row['rating_count'] else None,
+        )
+
+        user = getattr(context.get('request'), 'user', None)
+        if user is None or not user.is_authenticated:
+            fields['registers_count'] = ((), lambda row: 0)
+        elif user.is_creator:
+            # Needs the annotate_user_list() annotation.
+            fields['registers_count'] = (('managers_registers_count',), itemgetter('managers_registers_count'))
+        else:
+            fields['registers_count'] = (('registers_count',), itemgetter('registers_count'))
+        return fields
 
 class UserImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to User"""
@@ -94,6 +179,22 @@ class UserImageSerializer(serializers.ModelSerializer):
         fields = UserSerializer.Meta.fields + ['image']
 
 
+class ProvisionUserSerializer(serializers.Serializer):
+    """Serializer for one row of a bulk manager/technician provisioning."""
+    email = serializers.EmailField(max_length=255)
+    first_name = serializers.CharField(max_length=255)
+    last_name = serializers.CharField(max_length=255)
+    branch = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    password = serializers.CharField(min_length=5, write_only=True)
+    role = serializers.ChoiceField(choices=['manager', 'technician'], default='manager')
+
+    def validate_email(self, value):
+        return User.objects.normalize_email(value)
+
+    def validate_branch(self, value):
+        return value or None
+
+
 class RatingSerializer(serializers.ModelSerializer):
     creator_name = serializers.CharField(source="creator.get_full_name", read_only=True)
     technician_name = serializers.CharField(source="technician.get_full_name", read_only=True)
@@ -101,7 +202,7 @@ class RatingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Rating
         fields = ['id', 'technician', 'creator', 'rating', 'comment', 'created', 'creator_name', 'technician_name']
-        read_only_fields = ['creator', 'created']
+        read_only_fields = ['technician', 'creator', 'created']
 
 class WorkRequestSerializer(serializers.ModelSerializer):
     technician = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(is_technique=True))
@@ -144,12 +245,13 @@ class TechnicianStatusSerializer(serializers.ModelSerializer):
     
 class WorkRequestSerializer(serializers.ModelSerializer):
     owner_image = serializers.SerializerMethodField()
+    owner_image_thumbnails = serializers.SerializerMethodField()
     owner_name = serializers.SerializerMethodField()
     owner_email = serializers.SerializerMethodField()
     
     class Meta:
         model = WorkRequest
-        fields = ['id', 'owner_name', 'owner_email', 'status', 'owner_image', 'updated_at']
+        fields = ['id', 'owner_name', 'owner_email', 'status', 'owner_image', 'owner_image_thumbnails', 'updated_at']
 
     def get_owner_name(self, obj):
         return f"{obj.owner.first_name} {obj.owner.last_name}"
@@ -161,6 +263,9 @@ class WorkRequestSerializer(serializers.ModelSerializer):
         if obj.owner.image:
             return obj.owner.image.url
         return None
+
+    def get_owner_image_thumbnails(self, obj):
+        return rendition_urls(obj.owner.image, 'user')
     
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
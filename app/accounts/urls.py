@@ -21,11 +21,18 @@ urlpatterns = [
     path('create-manager/', views.ControlManagerViewSet.as_view(), name='create-manager'),
     path('get-manager/<int:pk>/', views.ControlManagerViewSet.as_view(), name='get-manager'),
     path('delete-manager/<int:pk>/', views.ControlManagerViewSet.as_view(), name='delete-manager'),
+    path('provision/', views.ProvisionUsersView.as_view(), name='provision'),
     path('get-managers/', views.GetManagersView.as_view(), name='get-managers'),
     path('search-manager/', views.SearchManagerViewSet.as_view(), name='search-manager'),
 
     # Techniques
     path('get-technicians/', views.GetTechniciansAPIView.as_view(), name='get-techniques'),
+    path('technicians/<int:technician_id>/ratings/', views.TechnicianRatingAPIView.as_view(), name='technician-ratings'),
+    path(
+        'technicians/<int:technician_id>/ratings/summary/',
+        views.TechnicianRatingSummaryAPIView.as_view(),
+        name='technician-rating-summary',
+    ),
 
     # States
     path('send-request/', views.SendWorkRequestView.as_view(), name='send-request'),
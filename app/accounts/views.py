@@ -3,18 +3,26 @@ Views for users.
 """
 
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.authentication import SessionAuthentication
 from rest_framework import generics
 from rest_framework.generics import UpdateAPIView
 from . import serializers
+from .provisioning import PROVISION_FORMATS, provision_users, read_rows
 from rest_framework_simplejwt.views import TokenObtainPairView
-from .serializers import MyTokenObtainPairSerializer, RatingSerializer, TechnicianStatusSerializer, UserSerializer, WorkRequestSerializer
+from .serializers import MyTokenObtainPairSerializer, RatingSerializer, TechnicianStatusSerializer, UserSerializer, WorkRequestSerializer, annotate_user_list
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
-from django.db.models import Q
-from core.models import Rating, User, WorkRequest
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from core.authentication import CachedJWTAuthentication
+from core.conditional import conditional_get
+from core.fieldsets import requested_fields, serialize_list
+from core.models import Rating, RatingStarCount, Register, User, WorkRequest
+from core.pagination import KeysetPagination
+from core.search import user_index
+from core.throttling import RoleRateThrottle
 from rest_framework.decorators import action
 from rest_framework import viewsets
 
@@ -38,14 +46,30 @@ class CreateUserView(generics.CreateAPIView):
 
 class LoginView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
+    throttle_classes = [RoleRateThrottle]
+    throttle_scope = 'login'
+
+def user_detail_state(view, request):
+    """Validators for the user detail: the user row, its registers and ratings."""
+    user = request.user
+    owners = user.register_owners() if user.is_creator else [user]
+    registers = Register.objects.filter(owner__in=owners).aggregate(latest=Max('created'), count=Count('id'))
+    ratings = user.ratings_received.aggregate(latest=Max('created'), count=Count('id'))
+    state = (user.updated_at, registers['latest'], registers['count'], ratings['latest'], ratings['count'])
+    # No Last-Modified: counter updates and deleted registers move none of these timestamps.
+    return state, None
+
 
 class UserDetailView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(user_detail_state)
     def get(self, request):
         user = request.user
-        user_serializer = UserSerializer(user, context={'request': request})
+        user_serializer = UserSerializer(
+            user, context={'request': request, 'fields': requested_fields(request, UserSerializer)}
+        )
         return Response(user_serializer.data)
     
 class UserUpdateView(UpdateAPIView):
@@ -185,6 +209,85 @@ class ControlManagerViewSet(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+class ProvisionUsersView(APIView):
+    """
+    Create many managers and technicians for the calling creator at once.
+
+    Accepts a JSON list (or ``{"users": [...]}``) of rows, or a CSV or JSON
+    ``file`` upload; see ``accounts.provisioning`` for the columns. The
+    response holds one result per row, in order.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [RoleRateThrottle]
+    throttle_scope = 'user-provision'
+
+    def post(self, request):
+        user = request.user
+
+        if not user.is_creator:
+            return Response(
+                {"detail": "You do not have permission to create managers."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                fmt = upload.name.rsplit('.', 1)[-1].lower()
+                if fmt not in PROVISION_FORMATS:
+                    return Response(
+                        {"detail": "The file must be a .csv or .json file."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                rows = read_rows(upload.read().decode('utf-8-sig'), fmt)
+            elif isinstance(request.data, list):
+                rows = request.data
+            elif isinstance(request.data, dict):
+                rows = request.data.get('users')
+            else:
+                raise ValueError('Expected a JSON list of users.')
+        except ValueError as e:
+            return Response({"detail": f"Could not read the users: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not isinstance(rows, list) or not rows:
+            return Response({"detail": "A non-empty list of users is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.PROVISION_MAX_USERS:
+            return Response(
+                {"detail": f"At most {settings.PROVISION_MAX_USERS} users per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            results = provision_users(user, rows)
+        except IntegrityError:
+            return Response(
+                {"detail": "Some of these users were created meanwhile; retry to see which."},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        created = sum(result['status'] == 'created' for result in results)
+        if not created:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif created < len(rows):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+
+        return Response(
+            {
+                "detail": f"{created} of {len(rows)} users created.",
+                "results": results,
+            },
+            status=response_status
+        )
+
+
+def ranked_users(users, ids):
+    """Load the users among ``ids`` in the order of ``ids``."""
+    position = {pk: index for index, pk in enumerate(ids)}
+    return sorted(users.filter(pk__in=ids), key=lambda user: position[user.pk])
+
+
 class GetManagersView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -197,20 +300,27 @@ class GetManagersView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        managers = user.managers.all()
+        managers = annotate_user_list(user.managers.all(), request)
+
+        paginator = KeysetPagination(ordering=('id',))
+        managers_data, paginated = serialize_list(
+            UserSerializer, managers, request, paginator, context={'request': request}
+        )
 
-        if not managers:
+        if not managers_data:
             return Response(
                 {"detail": "No managers found."},
                 status=status.HTTP_404_NOT_FOUND
             )
-        
-        manager_serializer = UserSerializer(managers, many=True)
 
-        return Response({
+        data = {
             "detail": "Managers retrieved successfully.",
-            "managers": manager_serializer.data
-        }, status=status.HTTP_200_OK)
+            "managers": managers_data
+        }
+        if paginated:
+            data["next"] = paginator.get_next_link()
+
+        return Response(data, status=status.HTTP_200_OK)
 
 class SearchManagerViewSet(APIView):
     permission_classes = [IsAuthenticated]
@@ -225,21 +335,26 @@ class SearchManagerViewSet(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
+        paginator = KeysetPagination(ordering=('id',))
+        managers = annotate_user_list(user.managers.all(), request)
         if query == '':
-            managers = user.managers.all()
-            serializer = UserSerializer(managers, context={'request': request}, many=True)
-            return Response(
-                {'managers': serializer.data},
-                status=status.HTTP_200_OK
+            managers_data, paginated = serialize_list(
+                UserSerializer, managers, request, paginator, context={'request': request}
             )
+        else:
+            # Ranked matches, best first; the result always fits in one page.
+            among = set(user.managers.values_list('pk', flat=True))
+            ids = user_index.search(query, settings.USER_SEARCH_LIMIT, among=among)
+            context = {'request': request, 'fields': requested_fields(request, UserSerializer)}
+            managers_data = UserSerializer(ranked_users(managers, ids), context=context, many=True).data
+            paginated = paginator.is_requested(request)
+
+        data = {'managers': managers_data}
+        if paginated:
+            data['next'] = paginator.get_next_link()
 
-        managers = user.managers.filter(
-            Q(first_name__icontains=query) | Q(last_name__icontains=query)
-        )
-
-        serializer = UserSerializer(managers, context={'request': request}, many=True)
         return Response(
-            {'managers': serializer.data},
+            data,
             status=status.HTTP_200_OK
         )
     
@@ -259,7 +374,9 @@ class TechnicianRatingAPIView(APIView):
         data = request.data
         serializer = RatingSerializer(data=data)
         if serializer.is_valid():
-            serializer.save(creator=user, technician=technician)
+            # The rating and the technician's rating_sum/rating_count change together.
+            with transaction.atomic():
+                serializer.save(creator=user, technician=technician)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -269,9 +386,33 @@ class TechnicianRatingAPIView(APIView):
         except User.DoesNotExist:
             return Response({"detail": "Technician not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        ratings = Rating.objects.filter(technician=technician)
-        serializer = RatingSerializer(ratings, many=True)
-        return Response(serializer.data)
+        ratings = Rating.objects.filter(technician=technician).select_related('creator', 'technician')
+
+        paginator = KeysetPagination(always=True)
+        page = paginator.paginate_queryset(ratings, request, view=self)
+        serializer = RatingSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class TechnicianRatingSummaryAPIView(APIView):
+    """Star histogram and average rating of a technician, read from RatingStarCount."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, technician_id):
+        counts = dict(
+            RatingStarCount.objects.filter(technician_id=technician_id).values_list('stars', 'count')
+        )
+        # No histogram rows: either no ratings yet or no such technician.
+        if not counts and not User.objects.filter(id=technician_id, is_technique=True).exists():
+            return Response({"detail": "Technician not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        total = sum(counts.values())
+        return Response({
+            "technician": technician_id,
+            "count": total,
+            "average_rating": sum(stars * count for stars, count in counts.items()) / total if total else None,
+            "histogram": {stars: counts.get(stars, 0) for stars in range(1, 6)},
+        })
     
 class GetTechniciansAPIView(APIView):
     permission_classes = [IsAuthenticated]
@@ -286,24 +427,26 @@ class GetTechniciansAPIView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        if query == '':
-            technicians = User.objects.filter(is_active=True, is_technique=True)
+        technicians = annotate_user_list(User.objects.filter(is_active=True, is_technique=True), request)
 
-            serializer = UserSerializer(technicians, many=True)
+        paginator = KeysetPagination(ordering=('id',))
+        if query != '':
+            # Ranked matches, best first; the result always fits in one page.
+            ids = user_index.search(query, settings.USER_SEARCH_LIMIT, technicians=True)
+            context = {'request': request, 'fields': requested_fields(request, UserSerializer)}
+            serializer = UserSerializer(ranked_users(technicians, ids), context=context, many=True)
+            if paginator.is_requested(request):
+                return Response({'next': None, 'results': serializer.data}, status=status.HTTP_200_OK)
+            return Response(serializer.data, status=status.HTTP_200_OK)
 
-            return Response(
-                serializer.data,
-                status=status.HTTP_200_OK
-            )
-
-        technicians = User.objects.filter(
-            Q(first_name__icontains=query) | Q(last_name__icontains=query)
+        data, paginated = serialize_list(
+            UserSerializer, technicians, request, paginator, context={'request': request}
         )
+        if paginated:
+            return paginator.get_paginated_response(data)
 
-        serializer = UserSerializer(technicians, many=True)
-        
         return Response(
-            serializer.data,
+            data,
             status=status.HTTP_200_OK
         )
     
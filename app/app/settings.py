@@ -55,6 +55,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.routers.PrimaryReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -97,6 +98,37 @@ DATABASES = {
     }
 }
 
+# Optional read replica (core.routers). Safe requests read from it; users are
+# pinned to the primary for DB_REPLICA_PIN_SECONDS after they write.
+
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', '5'))
+
+
+# Cache
+# Local memory by default, for development only: throttling, replica pins and
+# version tokens must be shared by every worker, so with DEBUG off the
+# core.E001 check requires a shared backend, e.g. CACHE_BACKEND
+# django_redis.cache.RedisCache with CACHE_LOCATION redis://redis:6379/1.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -140,6 +172,8 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
     "http://localhost:5174"
@@ -189,13 +223,88 @@ SIMPLE_JWT = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     )
 }
 
+# Seconds an authenticated user's row stays cached (core.authentication)
+
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', '300'))
+
+# Keyset pagination (core.pagination.KeysetPagination)
+
+KEYSET_PAGE_SIZE = int(os.getenv('KEYSET_PAGE_SIZE', '50'))
+KEYSET_MAX_PAGE_SIZE = int(os.getenv('KEYSET_MAX_PAGE_SIZE', '200'))
+
+# Most users returned by a type-ahead search (core.search)
+
+USER_SEARCH_LIMIT = int(os.getenv('USER_SEARCH_LIMIT', '20'))
+
+# Seconds after which a worker's search index re-reads the recently changed
+# users even if no version bump reached it (core.search)
+
+USER_SEARCH_RESYNC_SECONDS = int(os.getenv('USER_SEARCH_RESYNC_SECONDS', '60'))
+
+# Seconds a technician's 7-day register chart stays cached (registers.views)
+
+TECHNICIAN_REGISTERS_CACHE_TIMEOUT = int(os.getenv('TECHNICIAN_REGISTERS_CACHE_TIMEOUT', '300'))
+
+# Largest number of buckets one analytics request may ask for (core.analytics)
+
+ANALYTICS_MAX_BUCKETS = int(os.getenv('ANALYTICS_MAX_BUCKETS', '2000'))
+
+# Throttling (core.throttling.RoleRateThrottle)
+# Rates per endpoint scope and caller role: creator, technician, manager, anon.
+
+THROTTLE_CACHE = 'default'
+
+THROTTLE_RATES = {
+    'login': {'anon': '10/m'},
+    'pest-register': {'creator': '1/10s', 'technician': '1/10s', 'manager': '1/10s'},
+    'pest-register-batch': {'creator': '30/h', 'technician': '30/h', 'manager': '30/h'},
+    'user-provision': {'creator': '10/h'},
+}
+
+# Image renditions (core.renditions)
+# Bounding boxes of the thumbnails generated for every uploaded image.
+
+IMAGE_RENDITIONS = {
+    'pest': {'list': (320, 320), 'detail': (1280, 1280)},
+    'user': {'avatar': (128, 128)},
+}
+IMAGE_RENDITION_QUALITY = 80
+IMAGE_RENDITION_WORKERS = int(os.getenv('IMAGE_RENDITION_WORKERS', '2'))
+
+# Offline sync batches (registers.views.PestRegisterBatchCreateView)
+
+REGISTER_BATCH_MAX_SIZE = int(os.getenv('REGISTER_BATCH_MAX_SIZE', '500'))
+
+# Bulk user provisioning (accounts.provisioning)
+
+PROVISION_MAX_USERS = int(os.getenv('PROVISION_MAX_USERS', '1000'))
+PROVISION_BATCH_SIZE = 500
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 1)))
+
+# Resumable photo uploads (core.uploads): partial files live outside MEDIA_ROOT
+# until finalized. Chunks must fit in DATA_UPLOAD_MAX_MEMORY_SIZE.
+
+UPLOAD_SESSION_ROOT = os.getenv('UPLOAD_SESSION_ROOT', '/vol/web/partial-uploads')
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(1024 * 1024)))
+UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', str(25 * 1024 * 1024)))
+UPLOAD_SESSION_TTL = timedelta(hours=int(os.getenv('UPLOAD_SESSION_TTL_HOURS', '24')))
+
+# Registers older than this many days are moved to RegisterArchive by the
+# archive_registers command, keeping the hot table small.
+
+REGISTER_ARCHIVE_AFTER_DAYS = int(os.getenv('REGISTER_ARCHIVE_AFTER_DAYS', '365'))
+
+# Register exports (core.exports): rows fetched per query while streaming
+
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -0,0 +1,30 @@
+"""
+Settings for the test suite.
+
+    python manage.py test --settings=app.test_settings
+
+Two SQLite databases stand in for the MySQL primary and its read replica,
+so the suite needs no database server and exercises core.routers.
+"""
+import os
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+
+from .settings import *  # noqa: E402,F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test-default.sqlite3',  # noqa: F405
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test-replica.sqlite3',  # noqa: F405
+    },
+}
+
+# The test runner turns DEBUG off but runs in one process, where the local
+# memory cache is shared by everything under test.
+SILENCED_SYSTEM_CHECKS = ['core.E001']
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
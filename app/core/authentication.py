@@ -0,0 +1,61 @@
+"""
+JWT authentication backed by a per-user cache.
+
+Access tokens only identify the user: role claims would outlive a demotion
+or deactivation until the token expires. The user row itself is cached
+against the ``user`` version token (see ``core.cache``), which every save,
+deletion and counter update of the user bumps, so an authenticated request
+usually costs two cache reads and no query. A process-local cache would
+miss the bumps made by other workers, so without a shared backend every
+request reads the user from the database.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.cache import get_versions, shared_cache_configured
+from core.models import User
+
+
+def cached_user(user_id):
+    """Return user ``user_id`` from the cache, loading it on a miss; None if it is gone."""
+    if not shared_cache_configured():
+        return User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).first()
+    version = get_versions('user', [user_id])[user_id]
+    key = f'auth-user:{user_id}:{version}'
+    user = cache.get(key)
+    if user is None:
+        # Read the primary: a lagging replica would cache the old row under the new version.
+        user = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).first()
+        if user is None:
+            return None
+        cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication resolving the token's user through ``cached_user``."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
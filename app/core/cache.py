@@ -0,0 +1,46 @@
+"""
+Version tokens for invalidating cached data without tracking every key.
+
+Cached values record the versions of the things they were computed from
+and are ignored once any of those versions moves on.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Backends whose data lives in (or never leaves) a single worker process.
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache_configured():
+    """Whether every worker sees the same default cache, and so the same versions."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def _version_key(namespace, ident):
+    return f'version:{namespace}:{ident}'
+
+
+def get_versions(namespace, idents):
+    """Return the current version token of every ident, minting missing ones."""
+    keys = {ident: _version_key(namespace, ident) for ident in idents}
+    found = cache.get_many(list(keys.values()))
+    versions = {}
+    for ident, key in keys.items():
+        if key not in found:
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+        versions[ident] = found[key]
+    return versions
+
+
+def bump_version(namespace, ident):
+    """Invalidate data cached against ``ident`` once the transaction commits."""
+    transaction.on_commit(
+        lambda: cache.set(_version_key(namespace, ident), uuid.uuid4().hex, None)
+    )
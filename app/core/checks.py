@@ -0,0 +1,27 @@
+"""
+System checks for settings the core app relies on.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from core.cache import shared_cache_configured
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Refuse a process-local default cache outside DEBUG.
+
+    Throttle budgets, replica write pins and version tokens all live in the
+    default cache; with one copy per worker the limits multiply and
+    invalidations never reach the other workers.
+    """
+    if settings.DEBUG or shared_cache_configured():
+        return []
+    return [
+        Error(
+            'The default cache is local to each process while DEBUG is off.',
+            hint='Set CACHE_BACKEND and CACHE_LOCATION to a shared cache, '
+                 'e.g. django_redis.cache.RedisCache and redis://redis:6379/1.',
+            id='core.E001',
+        )
+    ]
@@ -0,0 +1,45 @@
+"""
+Conditional GET (ETag / Last-Modified) support for API views.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_vary_headers, quote_etag
+from django.utils.http import http_date
+
+
+def conditional_get(validators):
+    """
+    Answer ``If-None-Match`` / ``If-Modified-Since`` before running a GET handler.
+
+    ``validators(view, request, *args, **kwargs)`` returns ``(state,
+    last_modified)``: a cheap summary of everything the response depends on
+    and when it last changed (or ``None``). When the client's copy is still
+    current a 304 is returned without calling the handler at all.
+
+    Only return a ``last_modified`` that every change to the response moves
+    forward: a client sending just ``If-Modified-Since`` is answered from it
+    alone. Deletions, backdated inserts and counter updates rarely do, so
+    most views return ``None`` and rely on the ETag.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            state, last_modified = validators(view, request, *args, **kwargs)
+            fingerprint = repr((request.user.pk, request.get_full_path(), state))
+            etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = handler(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+        return wrapper
+    return decorator
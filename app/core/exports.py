@@ -0,0 +1,116 @@
+"""
+Streaming CSV / NDJSON exports of registers.
+"""
+import csv
+import datetime
+import itertools
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core.models import Pest
+
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'pest_name': 'pest_name',
+    'pest_id': 'pest_id',
+    'owner_id': 'owner_id',
+    'owner_email': 'owner__email',
+    'created': 'created',
+    'image': 'image',
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def parse_bound(value, end=False):
+    """Parse an ISO date or datetime; a bare ``end`` date includes that whole day."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value!r}')
+        if end:
+            day += datetime.timedelta(days=1)
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_by_pest(queryset, pest):
+    """Narrow a register or rollup queryset to a pest given by id or name."""
+    if not pest:
+        return queryset
+    pest = Pest.objects.lookup(pest)
+    if pest is None:
+        return queryset.none()
+    return queryset.filter(pest=pest)
+
+
+def filter_registers(queryset, start=None, end=None, pest=None):
+    """Narrow a register queryset to an optional date range and pest (id or name)."""
+    if start:
+        queryset = queryset.filter(created__gte=parse_bound(start))
+    if end:
+        queryset = queryset.filter(created__lt=parse_bound(end, end=True))
+    return filter_by_pest(queryset, pest)
+
+
+def iterate_rows(queryset, chunk_size):
+    """
+    Yield export rows one primary-key chunk at a time.
+
+    MySQL drivers buffer a whole result set client side, so
+    ``QuerySet.iterator()`` on its own does not keep memory flat there;
+    seeking past the last primary key of each chunk does, on any backend.
+    """
+    queryset = queryset.order_by('pk').values_list(*EXPORT_COLUMNS.values())
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        last_pk = rows[-1][0]
+
+
+class Echo:
+    """File-like object whose write returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(
+            value.isoformat() if isinstance(value, datetime.datetime) else value
+            for value in row
+        )
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_COLUMNS, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(querysets, export_format, chunk_size):
+    """
+    Return an iterator over the encoded lines of a register export.
+
+    ``querysets`` are exported one after the other: the archived registers,
+    then the live ones, so rows stay in id order.
+    """
+    rows = itertools.chain.from_iterable(iterate_rows(queryset, chunk_size) for queryset in querysets)
+    if export_format == 'csv':
+        return csv_lines(rows)
+    return ndjson_lines(rows)
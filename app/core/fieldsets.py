@@ -0,0 +1,81 @@
+"""
+Sparse fieldsets (``?fields=id,first_name``) and a fast read-only list path.
+
+Serializers using ``SparseFieldsetMixin`` drop every field not listed in
+``context['fields']``. Those that also describe their fields in
+``values_fields(context)`` can render lists straight from ``.values()``
+rows: ``serialize_list`` takes that path whenever every requested field is
+described there, skipping model instantiation and field introspection per
+row, and falls back to the serializer otherwise.
+"""
+from django.core.files.storage import default_storage
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin keeping only the fields named in ``context['fields']``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def values_fields(cls, context):
+        """Return ``{field: (columns, render(row))}`` for the fields ``.values()`` can serve."""
+        return {}
+
+
+def readable_fields(serializer_class, context):
+    return [name for name, field in serializer_class(context=context).fields.items() if not field.write_only]
+
+
+def requested_fields(request, serializer_class):
+    """Return the field names asked for with ``?fields=``, or None for all of them."""
+    raw = request.query_params.get('fields')
+    if not raw:
+        return None
+    fields = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = set(fields) - set(readable_fields(serializer_class, {}))
+    if unknown:
+        raise ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+    return fields
+
+
+def media_url(name, context):
+    """Render a stored file name the way serializers.FileField does."""
+    if not name:
+        return None
+    url = default_storage.url(name)
+    request = context.get('request')
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def serialize_list(serializer_class, queryset, request, paginator=None, context=None):
+    """
+    Serialize a list queryset, honouring ``?fields=`` and paginating if asked.
+
+    Returns ``(data, paginated)``; when ``paginated`` is true the caller
+    should answer with ``paginator.get_paginated_response(data)``.
+    """
+    context = dict(context or {})
+    context.setdefault('fields', requested_fields(request, serializer_class))
+    names = context['fields'] or readable_fields(serializer_class, context)
+    spec = serializer_class.values_fields(context)
+
+    if not all(name in spec for name in names):
+        page = paginator.paginate_queryset(queryset, request) if paginator else None
+        rows = queryset if page is None else page
+        return serializer_class(rows, many=True, context=context).data, page is not None
+
+    columns = {column: None for name in names for column in spec[name][0]}
+    if paginator is not None:
+        # The cursor is built from the ordering columns.
+        columns.update((key.lstrip('-'), None) for key in paginator.ordering)
+    rows = queryset.prefetch_related(None).values(*columns)
+    page = paginator.paginate_queryset(rows, request) if paginator else None
+    renderers = [(name, spec[name][1]) for name in names]
+    data = [{name: render(row) for name, render in renderers} for row in (rows if page is None else page)]
+    return data, page is not None
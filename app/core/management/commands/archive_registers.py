@@ -0,0 +1,53 @@
+"""
+Django command to move old registers out of the hot table.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import Register, RegisterArchive
+from core.signals import keep_rollup
+
+ARCHIVE_FIELDS = ('id', 'pest_name', 'pest_id', 'owner_id', 'image', 'created')
+
+
+class Command(BaseCommand):
+    """Copy registers past the horizon to RegisterArchive and delete them, chunk by chunk."""
+    help = 'Archive registers older than REGISTER_ARCHIVE_AFTER_DAYS days.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.REGISTER_ARCHIVE_AFTER_DAYS)
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of registers moved per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        cutoff = timezone.now() - datetime.timedelta(days=options['days'])
+        # Never archive the newest register: some MySQL versions reset the
+        # auto increment counter to MAX(id) + 1 on restart, which would hand
+        # out ids already used in the archive.
+        newest_id = Register.objects.aggregate(newest=Max('id'))['newest']
+        candidates = Register.objects.filter(created__lt=cutoff).exclude(pk=newest_id).order_by('pk')
+
+        moved = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                rows = list(candidates.filter(pk__gt=last_id).values(*ARCHIVE_FIELDS)[:options['chunk_size']])
+                if not rows:
+                    break
+                RegisterArchive.objects.bulk_create([RegisterArchive(**row) for row in rows])
+                with keep_rollup():
+                    Register.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+
+            moved += len(rows)
+            last_id = rows[-1]['id']
+            self.stdout.write(f'Archived {moved} registers...')
+
+        self.stdout.write(self.style.SUCCESS(f'{moved} registers older than {cutoff:%Y-%m-%d} archived.'))
@@ -0,0 +1,72 @@
+"""
+Django command to compare the per-row cost of the two list serialization paths.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+
+from accounts.serializers import UserSerializer
+from core.fieldsets import serialize_list
+from core.models import Register, User
+from registers.serializers import RegisterSerializer
+
+
+class Command(BaseCommand):
+    """Time ModelSerializer lists against the .values() path on existing rows."""
+    help = (
+        'Benchmark per-row serialization of registers and users: the full '
+        'ModelSerializer against the .values() fast path.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def measure(self, label, serialize, repeat):
+        """Print the best time per row and the queries of one run."""
+        best = None
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                data = serialize()
+                elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        per_row = best / max(len(data), 1) * 1e6
+        self.stdout.write(f'  {label:<56} {per_row:8.1f} us/row  {len(queries.captured_queries):5} queries')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        rows, repeat = options['rows'], options['repeat']
+        cases = [
+            (
+                'registers', RegisterSerializer, 'id,pest_name,created,image_thumbnails',
+                lambda: Register.objects.order_by('-id')[:rows],
+            ),
+            (
+                'users', UserSerializer, 'id,first_name,last_name,image',
+                lambda: User.objects.prefetch_related('managers').order_by('id')[:rows],
+            ),
+        ]
+        for name, serializer_class, fields, queryset in cases:
+            count = len(queryset().values_list('pk'))
+            self.stdout.write(f'{name} ({count} rows)')
+            if not count:
+                continue
+            every_field = Request(RequestFactory().get('/'))
+            sparse = Request(RequestFactory().get('/', {'fields': fields}))
+            self.measure(
+                'ModelSerializer, all fields',
+                lambda: serializer_class(queryset(), many=True).data, repeat,
+            )
+            self.measure(
+                'serialize_list, all fields',
+                lambda: serialize_list(serializer_class, queryset(), every_field)[0], repeat,
+            )
+            self.measure(
+                f'serialize_list, ?fields={fields}',
+                lambda: serialize_list(serializer_class, queryset(), sparse)[0], repeat,
+            )
@@ -0,0 +1,108 @@
+"""
+Django command to check the hot queries are served by indexes.
+"""
+import datetime
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.models import Rating, RatingStarCount, Register, RegisterDailyCount, WorkRequest
+
+
+def hot_queries(user_id):
+    """Return (label, queryset) pairs for the main query of each hot endpoint."""
+    now = timezone.now()
+    return [
+        (
+            'pest-register rate window',
+            Register.objects.filter(owner_id=user_id, created__gte=now - datetime.timedelta(seconds=10)),
+        ),
+        (
+            'get-registers keyset page',
+            Register.objects.filter(owner_id=user_id).order_by('-created', '-id')[:51],
+        ),
+        (
+            'seven-day register chart',
+            RegisterDailyCount.objects.filter(owner_id=user_id, date__gte=now.date() - datetime.timedelta(days=7)),
+        ),
+        (
+            'technician send requests',
+            WorkRequest.objects.filter(technician_id=user_id, status='submitted'),
+        ),
+        (
+            'technician chart request owners',
+            WorkRequest.objects.filter(technician_id=user_id, status='working').values_list('owner', flat=True),
+        ),
+        (
+            'owner technician status',
+            WorkRequest.objects.filter(owner_id=user_id),
+        ),
+        (
+            'technician ratings page',
+            Rating.objects.filter(technician_id=user_id).order_by('-created', '-id')[:51],
+        ),
+        (
+            'technician rating histogram',
+            RatingStarCount.objects.filter(technician_id=user_id),
+        ),
+    ]
+
+
+def _nodes(plan):
+    """Yield every object of a JSON query plan."""
+    if isinstance(plan, dict):
+        yield plan
+        plan = list(plan.values())
+    if isinstance(plan, list):
+        for child in plan:
+            yield from _nodes(child)
+
+
+def plan_problems(queryset):
+    """Return the full scans and sorts in the query plan of ``queryset``."""
+    vendor = connection.vendor
+    if vendor == 'mysql':
+        nodes = list(_nodes(json.loads(queryset.explain(format='json'))))
+        problems = []
+        if any(node.get('access_type') == 'ALL' for node in nodes):
+            problems.append('full table scan')
+        if any(node.get('using_filesort') for node in nodes):
+            problems.append('filesort')
+        return problems
+
+    plan = queryset.explain()
+    if vendor == 'sqlite':
+        markers = {'SCAN ': 'full table scan', 'USE TEMP B-TREE': 'filesort'}
+    elif vendor == 'postgresql':
+        markers = {'Seq Scan': 'full table scan', 'Sort ': 'filesort'}
+    else:
+        raise CommandError(f'Query plans cannot be checked on {vendor}.')
+    return [problem for marker, problem in markers.items() if marker in plan]
+
+
+class Command(BaseCommand):
+    """Run EXPLAIN on each hot query and fail on full scans or filesorts."""
+    help = (
+        'Fail if a hot endpoint query falls back to a full scan or filesort. '
+        'Run it against a database holding representative data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, default=1)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        failures = []
+        for label, queryset in hot_queries(options['user_id']):
+            problems = plan_problems(queryset)
+            if problems:
+                failures.append(f"{label}: {', '.join(problems)}")
+                self.stdout.write(self.style.ERROR(f"{label}: {', '.join(problems)}"))
+            else:
+                self.stdout.write(f'{label}: ok')
+
+        if failures:
+            raise CommandError(f'{len(failures)} queries are not served by an index.')
+        self.stdout.write(self.style.SUCCESS('All hot queries use indexes.'))
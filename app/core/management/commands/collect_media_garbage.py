@@ -0,0 +1,90 @@
+"""
+Django command to delete media blobs no row references any more.
+"""
+import datetime
+import os
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Register, RegisterArchive, User
+
+# Upload directory -> (model, field) pairs whose values point into it.
+MEDIA_REFERENCES = {
+    os.path.join('uploads', 'pest'): [(Register, 'image'), (RegisterArchive, 'image')],
+    os.path.join('uploads', 'user'): [(User, 'image')],
+}
+
+
+class Command(BaseCommand):
+    """Count the references to every stored blob and delete the unreferenced ones."""
+    help = 'Garbage collect uploaded images, and their renditions, that nothing references.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=int, default=24,
+            help='Never delete blobs modified more recently than this.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        cutoff = timezone.now() - datetime.timedelta(hours=options['grace_hours'])
+        rendition_names = '|'.join(
+            re.escape(rendition)
+            for sizes in settings.IMAGE_RENDITIONS.values()
+            for rendition in sizes
+        )
+        rendition_pattern = re.compile(rf'^(?P<root>.+)_(?:{rendition_names})\.jpg$')
+
+        self.deleted = kept = 0
+        for directory, references in MEDIA_REFERENCES.items():
+            if not default_storage.exists(directory):
+                continue
+
+            blobs = []
+            renditions_by_root = defaultdict(list)
+            for name in default_storage.listdir(directory)[1]:
+                match = rendition_pattern.match(name)
+                if match:
+                    renditions_by_root[match.group('root')].append(name)
+                else:
+                    blobs.append(name)
+
+            for start in range(0, len(blobs), options['chunk_size']):
+                chunk = blobs[start:start + options['chunk_size']]
+                counts = dict.fromkeys((os.path.join(directory, name) for name in chunk), 0)
+                for model, field in references:
+                    referenced = model.objects.filter(**{f'{field}__in': list(counts)})
+                    for name in referenced.values_list(field, flat=True):
+                        counts[name] += 1
+
+                for name in chunk:
+                    root = os.path.splitext(name)[0]
+                    renditions = renditions_by_root.pop(root, [])
+                    if counts[os.path.join(directory, name)]:
+                        kept += 1
+                        continue
+                    self.collect(directory, [name] + renditions, cutoff, options['dry_run'])
+
+            # Renditions left over belong to originals that are already gone.
+            for renditions in renditions_by_root.values():
+                self.collect(directory, renditions, cutoff, options['dry_run'])
+
+        self.stdout.write(self.style.SUCCESS(f'{kept} referenced blobs kept, {self.deleted} files deleted.'))
+
+    def collect(self, directory, names, cutoff, dry_run):
+        """Delete a blob and its renditions unless the blob is still recent."""
+        paths = [os.path.join(directory, name) for name in names]
+        if default_storage.get_modified_time(paths[0]) > cutoff:
+            return
+        for path in paths:
+            self.stdout.write(f'Deleting {path}')
+            if not dry_run:
+                default_storage.delete(path)
+            self.deleted += 1
@@ -0,0 +1,51 @@
+"""
+Django command to delete abandoned resumable uploads.
+"""
+import os
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import UploadSession
+from core.uploads import discard
+
+
+class Command(BaseCommand):
+    """Delete expired upload sessions and partial files left without a session."""
+    help = 'Delete expired upload sessions and their partial files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        now = timezone.now()
+        expired = 0
+        while True:
+            sessions = list(UploadSession.objects.filter(expires_at__lte=now)[:options['chunk_size']])
+            if not sessions:
+                break
+            for session in sessions:
+                discard(session)
+            expired += len(sessions)
+
+        orphans = 0
+        if os.path.isdir(settings.UPLOAD_SESSION_ROOT):
+            cutoff = (now - settings.UPLOAD_SESSION_TTL).timestamp()
+            for entry in os.scandir(settings.UPLOAD_SESSION_ROOT):
+                root, ext = os.path.splitext(entry.name)
+                try:
+                    session_id = uuid.UUID(root)
+                except ValueError:
+                    continue
+                if (
+                    ext == '.part'
+                    and entry.stat().st_mtime < cutoff
+                    and not UploadSession.objects.filter(pk=session_id).exists()
+                ):
+                    os.remove(entry.path)
+                    orphans += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{expired} expired uploads and {orphans} orphaned files deleted.'))
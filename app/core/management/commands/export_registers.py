@@ -0,0 +1,54 @@
+"""
+Django command to export registers as CSV or NDJSON.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import EXPORT_FORMATS, export_lines, filter_registers
+from core.models import Register, RegisterArchive, User
+
+
+class Command(BaseCommand):
+    """Stream registers to stdout or a file without loading them in memory."""
+    help = 'Export the registers a user can see (all of them by default).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of the user whose view to export.')
+        parser.add_argument('--output', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--start', help='ISO date or datetime to export from.')
+        parser.add_argument('--end', help='ISO date or datetime to export until.')
+        parser.add_argument('--pest', help='Only export registers of this pest.')
+        parser.add_argument('--file', help='Write to this path instead of stdout.')
+        parser.add_argument('--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        querysets = [RegisterArchive.objects.all(), Register.objects.all()]
+        if options['user']:
+            try:
+                user = User.objects.get(email=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist.")
+            owners = user.register_owners()
+            querysets = [queryset.filter(owner__in=owners) for queryset in querysets]
+
+        try:
+            querysets = [
+                filter_registers(
+                    queryset,
+                    start=options['start'],
+                    end=options['end'],
+                    pest=options['pest'],
+                )
+                for queryset in querysets
+            ]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        lines = export_lines(querysets, options['output'], options['chunk_size'])
+        if options['file']:
+            with open(options['file'], 'w', newline='') as out:
+                out.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,42 @@
+"""
+Django command to generate missing thumbnails for stored images.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Register, User
+from core.renditions import generate_renditions
+
+
+class Command(BaseCommand):
+    """Backfill renditions for images uploaded before they existed."""
+    help = 'Generate missing renditions for pest and user images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of image names fetched per query.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        for model, kind in ((Register, 'pest'), (User, 'user')):
+            total = failed = 0
+            last_id = 0
+            while True:
+                rows = list(
+                    model.objects.filter(pk__gt=last_id)
+                    .exclude(image__isnull=True).exclude(image='')
+                    .order_by('pk')
+                    .values_list('pk', 'image')[:options['chunk_size']]
+                )
+                if not rows:
+                    break
+                for _, name in rows:
+                    try:
+                        generate_renditions(name, kind)
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f'{name}: {e}')
+                total += len(rows)
+                last_id = rows[-1][0]
+            self.stdout.write(self.style.SUCCESS(f'{kind}: {total} images processed, {failed} failed.'))
@@ -0,0 +1,56 @@
+"""
+Django command to bulk create a creator's managers and technicians.
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from accounts.provisioning import PROVISION_FORMATS, provision_users, read_rows
+from core.models import User
+
+
+class Command(BaseCommand):
+    """Provision users from a CSV or JSON file and report the outcome of every row."""
+    help = 'Create the managers and technicians listed in a CSV or JSON file for a creator.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV (with a header line) or JSON file of users.')
+        parser.add_argument('--creator', required=True, help='Email of the creator the users belong to.')
+        parser.add_argument(
+            '--format', choices=PROVISION_FORMATS,
+            help='Format of the file; guessed from its extension by default.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        try:
+            creator = User.objects.get(email=options['creator'], is_creator=True)
+        except User.DoesNotExist:
+            raise CommandError(f"Creator {options['creator']} does not exist.")
+
+        fmt = options['format'] or os.path.splitext(options['file'])[1].lstrip('.').lower()
+        if fmt not in PROVISION_FORMATS:
+            raise CommandError('Pass --format, the file extension is neither .csv nor .json.')
+
+        try:
+            with open(options['file'], encoding='utf-8-sig', newline='') as source:
+                rows = read_rows(source.read(), fmt)
+            results = provision_users(creator, rows)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read the users: {e}')
+        except IntegrityError:
+            raise CommandError('Some of these users were created meanwhile; run the command again.')
+
+        created = 0
+        for result in results:
+            if result['status'] == 'created':
+                created += 1
+                self.stdout.write(f"{result['index']}: created {result['role']} {result['email']} (id {result['id']})")
+            else:
+                errors = '; '.join(
+                    f"{field}: {' '.join(map(str, messages))}" for field, messages in result['errors'].items()
+                )
+                self.stdout.write(self.style.ERROR(f"{result['index']}: invalid, {errors}"))
+
+        self.stdout.write(self.style.SUCCESS(f'{created} of {len(results)} users created.'))
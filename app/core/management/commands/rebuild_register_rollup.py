@@ -0,0 +1,67 @@
+"""
+Django command to backfill or rebuild the daily register rollup.
+"""
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from core.cache import bump_version
+from core.models import Register, RegisterArchive, RegisterDailyCount, User
+
+
+class Command(BaseCommand):
+    """Recompute RegisterDailyCount from the live and archived registers, owner by owner."""
+    help = 'Backfill or rebuild the daily register rollup in chunks of owners.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of owners rebuilt per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        chunk_size = options['chunk_size']
+        last_id = 0
+        owners = buckets = 0
+
+        while True:
+            owner_ids = list(
+                User.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not owner_ids:
+                break
+
+            with transaction.atomic():
+                counts = Counter()
+                for model in (Register, RegisterArchive):
+                    rows = (
+                        model.objects.filter(owner_id__in=owner_ids)
+                        .annotate(date=TruncDate('created'))
+                        .values('owner', 'date', 'pest')
+                        .annotate(count=Count('id'))
+                    )
+                    for row in rows:
+                        counts[row['owner'], row['date'], row['pest']] += row['count']
+                RegisterDailyCount.objects.filter(owner_id__in=owner_ids).delete()
+                created = RegisterDailyCount.objects.bulk_create(
+                    [
+                        RegisterDailyCount(owner_id=owner_id, date=date, pest_id=pest_id, count=count)
+                        for (owner_id, date, pest_id), count in counts.items()
+                    ],
+                    batch_size=chunk_size,
+                )
+                for owner_id in owner_ids:
+                    bump_version('register-owner', owner_id)
+
+            owners += len(owner_ids)
+            buckets += len(created)
+            last_id = owner_ids[-1]
+            self.stdout.write(f'Rebuilt {owners} owners...')
+
+        self.stdout.write(self.style.SUCCESS(f'Rollup rebuilt: {buckets} daily buckets for {owners} owners.'))
@@ -0,0 +1,87 @@
+"""
+Django command to recompute the denormalized counters on User and the star histograms.
+"""
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from core.cache import bump_version
+from core.models import Rating, RatingStarCount, Register, RegisterArchive, User
+
+
+class Command(BaseCommand):
+    """Recompute registers_count, rating_sum, rating_count and RatingStarCount, user by user chunk."""
+    help = 'Recompute the register and rating counters and star histograms of every user in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of users repaired per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        chunk_size = options['chunk_size']
+        last_id = 0
+        users = repaired = 0
+
+        while True:
+            user_ids = list(
+                User.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not user_ids:
+                break
+
+            with transaction.atomic():
+                registers = Counter()
+                for model in (Register, RegisterArchive):
+                    rows = model.objects.filter(owner_id__in=user_ids).values('owner').annotate(total=Count('id'))
+                    for row in rows.order_by():
+                        registers[row['owner']] += row['total']
+                ratings = {
+                    row['technician']: (row['total'], row['count'])
+                    for row in Rating.objects.filter(technician_id__in=user_ids)
+                    .values('technician')
+                    .annotate(total=Sum('rating'), count=Count('id'))
+                    .order_by()
+                }
+
+                stale = []
+                for user in User.objects.select_for_update().filter(pk__in=user_ids).only(*User.COUNTER_FIELDS):
+                    counters = {
+                        'registers_count': registers[user.pk],
+                        'rating_sum': ratings.get(user.pk, (0, 0))[0],
+                        'rating_count': ratings.get(user.pk, (0, 0))[1],
+                    }
+                    if any(getattr(user, field) != value for field, value in counters.items()):
+                        for field, value in counters.items():
+                            setattr(user, field, value)
+                        stale.append(user)
+                User.objects.bulk_update(stale, User.COUNTER_FIELDS)
+                for user in stale:
+                    bump_version('user', user.pk)
+
+                stars = (
+                    Rating.objects.filter(technician_id__in=user_ids)
+                    .values('technician', 'rating')
+                    .annotate(count=Count('id'))
+                    .order_by()
+                )
+                RatingStarCount.objects.filter(technician_id__in=user_ids).delete()
+                RatingStarCount.objects.bulk_create(
+                    [
+                        RatingStarCount(technician_id=row['technician'], stars=row['rating'], count=row['count'])
+                        for row in stars
+                    ],
+                    batch_size=chunk_size,
+                )
+
+            users += len(user_ids)
+            repaired += len(stale)
+            last_id = user_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'{repaired} of {users} users had stale counters and were repaired.'))
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_registerdailycount'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='register',
+            name='created',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_alter_register_created'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['technician', 'created', 'id'], name='rating_technician_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='register',
+            index=models.Index(fields=['owner', 'created', 'id'], name='register_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workrequest',
+            index=models.Index(fields=['technician', 'status'], name='workrequest_tech_status_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Pest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PestAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('pest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='core.pest')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='register',
+            name='pest',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='registers', to='core.pest'),
+        ),
+        migrations.AddField(
+            model_name='registerdailycount',
+            name='pest',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='daily_counts', to='core.pest'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='registerdailycount',
+            unique_together={('owner', 'date', 'pest')},
+        ),
+    ]
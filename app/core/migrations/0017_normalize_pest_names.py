@@ -0,0 +1,54 @@
+import unicodedata
+
+from django.db import migrations
+
+BATCH_SIZE = 5000
+
+
+def normalize_pest_name(name):
+    """Copy of core.models.normalize_pest_name as of this migration."""
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.lower().split())
+
+
+def link_registers_to_catalog(apps, schema_editor):
+    """Resolve every register's free-text pest_name to a catalog pest, in batches."""
+    Pest = apps.get_model('core', 'Pest')
+    PestAlias = apps.get_model('core', 'PestAlias')
+    Register = apps.get_model('core', 'Register')
+
+    pests = {alias.name: alias.pest_id for alias in PestAlias.objects.all()}
+    last_pk = 0
+    while True:
+        rows = list(
+            Register.objects.filter(pk__gt=last_pk, pest__isnull=True)
+            .order_by('pk')
+            .values_list('pk', 'pest_name')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+
+        by_pest = {}
+        for pk, pest_name in rows:
+            alias = normalize_pest_name(pest_name)
+            if alias not in pests:
+                pest, _ = Pest.objects.get_or_create(name=pest_name.strip())
+                PestAlias.objects.create(pest=pest, name=alias)
+                pests[alias] = pest.pk
+            by_pest.setdefault(pests[alias], []).append(pk)
+
+        for pest_id, pks in by_pest.items():
+            Register.objects.filter(pk__in=pks).update(pest_id=pest_id)
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_pest_catalog'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_registers_to_catalog, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_normalize_pest_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registerdailycount',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
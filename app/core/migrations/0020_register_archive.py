@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:16
+
+import core.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegisterArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('pest_name', models.CharField(max_length=255)),
+                ('image', models.ImageField(null=True, upload_to=core.models.pest_image_file_path)),
+                ('created', models.DateTimeField()),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_registers', to=settings.AUTH_USER_MODEL)),
+                ('pest', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_registers', to='core.pest')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='registerarchive',
+            index=models.Index(fields=['owner', 'created', 'id'], name='archive_owner_created_idx'),
+        ),
+    ]
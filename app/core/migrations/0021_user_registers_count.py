@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:17
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_registers(apps, schema_editor):
+    """Backfill User.registers_count from the live and archived registers."""
+    User = apps.get_model('core', 'User')
+    counts = Counter()
+    for model_name in ('Register', 'RegisterArchive'):
+        model = apps.get_model('core', model_name)
+        for row in model.objects.values('owner').annotate(total=Count('id')).order_by():
+            counts[row['owner']] += row['total']
+    for owner_id, total in counts.items():
+        User.objects.filter(pk=owner_id).update(registers_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_register_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='registers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_registers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:18
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def aggregate_ratings(apps, schema_editor):
+    """Backfill rating_sum and rating_count from the stored ratings."""
+    User = apps.get_model('core', 'User')
+    Rating = apps.get_model('core', 'Rating')
+    rows = Rating.objects.values('technician').annotate(total=Sum('rating'), count=Count('id')).order_by()
+    for row in rows:
+        User.objects.filter(pk=row['technician']).update(rating_sum=row['total'], rating_count=row['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_user_registers_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(aggregate_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:29
+
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 5000
+
+
+def closure_depths(parents, nodes):
+    """Copy of core.models.closure_depths as of this migration."""
+    depths = {}
+    for node in nodes:
+        queue = deque([(node, 0)])
+        seen = {node}
+        while queue:
+            child, depth = queue.popleft()
+            for parent in parents.get(child, ()):
+                if parent not in seen:
+                    seen.add(parent)
+                    depths[parent, node] = depth + 1
+                    queue.append((parent, depth + 1))
+    return depths
+
+
+def build_closure(apps, schema_editor):
+    """Backfill the closure of every user's managers from the User.managers rows."""
+    User = apps.get_model('core', 'User')
+    OrganizationClosure = apps.get_model('core', 'OrganizationClosure')
+
+    parents = defaultdict(list)
+    for child, parent in User.managers.through.objects.values_list('to_user_id', 'from_user_id').iterator():
+        parents[child].append(parent)
+
+    OrganizationClosure.objects.bulk_create(
+        (
+            OrganizationClosure(ancestor_id=ancestor, descendant_id=descendant, depth=depth)
+            for (ancestor, descendant), depth in closure_depths(parents, list(parents)).items()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_user_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to=settings.AUTH_USER_MODEL)),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='organizationclosure',
+            index=models.Index(fields=['descendant', 'depth'], name='closure_descendant_depth_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='organizationclosure',
+            constraint=models.UniqueConstraint(fields=('ancestor', 'descendant'), name='closure_ancestor_descendant_uniq'),
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:31
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def count_stars(apps, schema_editor):
+    """Backfill every technician's star histogram from the stored ratings."""
+    Rating = apps.get_model('core', 'Rating')
+    RatingStarCount = apps.get_model('core', 'RatingStarCount')
+    rows = Rating.objects.values('technician', 'rating').annotate(count=Count('id')).order_by()
+    RatingStarCount.objects.bulk_create(
+        (RatingStarCount(technician_id=row['technician'], stars=row['rating'], count=row['count']) for row in rows),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_organization_closure'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rating',
+            name='rating',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.CreateModel(
+            name='RatingStarCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stars', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('technician', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_star_counts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('technician', 'stars')},
+            },
+        ),
+        migrations.RunPython(count_stars, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,12 @@
 import uuid
 import os
+import unicodedata
+from collections import Counter, defaultdict, deque
 
 from django.conf import settings
-from django.db import models
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     PermissionsMixin,
@@ -10,6 +14,9 @@ from django.contrib.auth.models import (
 
 from django.contrib.auth import get_user_model
 
+from core.cache import bump_version
+from core.renditions import schedule_renditions
+
 def user_image_file_path(instance, filename):
     """Generate file path for new user image."""
     ext = os.path.splitext(filename)[1]
@@ -76,12 +83,28 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_creator = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    registers_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
 
+    # Denormalized counters, only ever changed with F() updates.
+    COUNTER_FIELDS = ('registers_count', 'rating_sum', 'rating_count')
+
+    def save(self, *args, **kwargs):
+        """Save without overwriting the counters with a stale in-memory copy."""
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def get_full_name(self):
         return f'{self.first_name} {self.last_name}'
     
@@ -94,13 +117,49 @@ class User(AbstractBaseUser, PermissionsMixin):
     def assign_manager(self, manager):
         """Assign a manager to this user if the user is a creator."""
         if self.is_creator:
-            self.managers.add(manager)
-            self.save()
+            with transaction.atomic():
+                self.managers.add(manager)
+                OrganizationClosure.objects.rebuild_for([manager.pk])
+            self.touch()
+
+    def set_managers(self, managers):
+        """
+        Make ``managers`` the managers of this creator, writing only the changed links.
+
+        Non-creators cannot have managers and end up with none. The user row
+        itself is not saved; callers not saving it anyway should ``touch()`` it.
+        """
+        wanted = {manager.pk for manager in managers} if self.is_creator else set()
+        through = User.managers.through
+        with transaction.atomic():
+            current = set(through.objects.filter(from_user_id=self.pk).values_list('to_user_id', flat=True))
+            added, removed = wanted - current, current - wanted
+            if removed:
+                through.objects.filter(from_user_id=self.pk, to_user_id__in=removed).delete()
+            if added:
+                through.objects.bulk_create([through(from_user_id=self.pk, to_user_id=pk) for pk in added])
+            if added or removed:
+                OrganizationClosure.objects.rebuild_for(added | removed)
+
+    def touch(self):
+        """Move updated_at, and drop cached copies of the user, without rewriting the row."""
+        self.updated_at = timezone.now()
+        User.objects.filter(pk=self.pk).update(updated_at=self.updated_at)
+        bump_version('user', self.pk)
     
+    def register_owners(self):
+        """Return the users whose registers this user can see."""
+        if self.is_creator:
+            # Everyone under the creator, at any depth.
+            return User.objects.filter(ancestor_links__ancestor=self)
+        if self.is_technique:
+            return User.objects.filter(descendant_links__descendant=self, descendant_links__depth=1)
+        return User.objects.filter(pk=self.pk)
+
     @property
     def average_rating(self):
-        if self.is_technique:
-            return self.ratings_received.aggregate(models.Avg('rating'))['rating__avg']
+        if self.is_technique and self.rating_count:
+            return self.rating_sum / self.rating_count
         return None
 
     def create_manager(self, email, first_name, last_name, branch, password=None, **extra_fields):
@@ -117,6 +176,88 @@ class User(AbstractBaseUser, PermissionsMixin):
             return manager
         return None
 
+def closure_depths(parents, nodes):
+    """
+    Return ``{(ancestor, node): depth}`` for every ancestor of each of ``nodes``.
+
+    ``parents`` maps a user id to the ids of the users it is a manager of;
+    the depth is the length of the shortest path up to the ancestor.
+    """
+    depths = {}
+    for node in nodes:
+        queue = deque([(node, 0)])
+        seen = {node}
+        while queue:
+            child, depth = queue.popleft()
+            for parent in parents.get(child, ()):
+                if parent not in seen:
+                    seen.add(parent)
+                    depths[parent, node] = depth + 1
+                    queue.append((parent, depth + 1))
+    return depths
+
+
+class OrganizationClosureManager(models.Manager):
+    def rebuild_for(self, user_ids):
+        """
+        Recompute the closure rows of ``user_ids`` and of everyone under them.
+
+        Call it, inside the same transaction, after changing the managers of
+        anyone whose id is in ``user_ids``.
+        """
+        edges = User.managers.through.objects.using(self.db)
+        with transaction.atomic(using=self.db):
+            affected, frontier = set(user_ids), set(user_ids)
+            while frontier:
+                frontier = set(
+                    edges.filter(from_user_id__in=frontier).values_list('to_user_id', flat=True)
+                ) - affected
+                affected |= frontier
+
+            parents = defaultdict(list)
+            seen, frontier = set(), set(affected)
+            while frontier:
+                seen |= frontier
+                rows = list(edges.filter(to_user_id__in=frontier).values_list('to_user_id', 'from_user_id'))
+                for child, parent in rows:
+                    parents[child].append(parent)
+                frontier = {parent for _, parent in rows} - seen
+
+            self.filter(descendant_id__in=affected).delete()
+            self.bulk_create(
+                [
+                    self.model(ancestor_id=ancestor, descendant_id=descendant, depth=depth)
+                    for (ancestor, descendant), depth in closure_depths(parents, affected).items()
+                ],
+                batch_size=1000,
+            )
+
+
+class OrganizationClosure(models.Model):
+    """
+    Transitive closure of ``User.managers``: ``descendant`` is ``depth`` levels under ``ancestor``.
+
+    Lets "everyone under this user" be one indexed join whatever the depth
+    of the hierarchy. Kept in sync through ``OrganizationClosure.objects.rebuild_for``.
+    """
+    ancestor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="descendant_links")
+    descendant = models.ForeignKey(User, on_delete=models.CASCADE, related_name="ancestor_links")
+    depth = models.PositiveSmallIntegerField()
+
+    objects = OrganizationClosureManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='closure_ancestor_descendant_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='closure_descendant_depth_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+
 class Rating(models.Model):
     technician = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -130,23 +271,263 @@ class Rating(models.Model):
         related_name="ratings_given",
         limit_choices_to={'is_creator': True},
     )
-    rating = models.PositiveSmallIntegerField()  # Calificación entre 1 y 5, por ejemplo
+    rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField(blank=True, null=True)
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['technician', 'created', 'id'], name='rating_technician_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Rating {self.rating} for {self.technician_id} by {self.creator_id}"
+
+
+class RatingStarCountManager(models.Manager):
+    def add(self, technician_id, stars, amount=1):
+        """Add ``amount`` (which may be negative) to the technician's count of ``stars`` ratings."""
+        bucket = self.filter(technician_id=technician_id, stars=stars)
+        if bucket.update(count=models.F('count') + amount) or amount < 0:
+            return
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(technician_id=technician_id, stars=stars, count=amount)
+        except IntegrityError:
+            bucket.update(count=models.F('count') + amount)
+
+
+class RatingStarCount(models.Model):
+    """Number of ratings of ``stars`` stars a technician received (their star histogram)."""
+    technician = models.ForeignKey(User, on_delete=models.CASCADE, related_name="rating_star_counts")
+    stars = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    objects = RatingStarCountManager()
+
+    class Meta:
+        unique_together = ('technician', 'stars')
+
+    def __str__(self):
+        return f"{self.technician_id} {self.stars} stars: {self.count}"
+
+
+def normalize_pest_name(name):
+    """Return the lookup form of a pest name: accent free, lowercase, single spaced."""
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.lower().split())
+
+
+class PestManager(models.Manager):
+    def lookup(self, value):
+        """Return the pest with id ``value`` or named ``value`` (or an alias), if any."""
+        value = str(value).strip()
+        if value.isdigit():
+            return self.filter(pk=int(value)).first()
+        alias = PestAlias.objects.select_related('pest').filter(name=normalize_pest_name(value)).first()
+        return alias.pest if alias else None
+
+    def resolve_many(self, names):
+        """Map every name to its catalog pest, adding names never seen before."""
+        normalized = {name: normalize_pest_name(name) for name in names}
+        aliases = {
+            alias.name: alias.pest
+            for alias in PestAlias.objects.select_related('pest').filter(name__in=set(normalized.values()))
+        }
+        for name, alias_name in normalized.items():
+            if alias_name not in aliases:
+                aliases[alias_name] = self._add(name.strip(), alias_name)
+        return {name: aliases[alias_name] for name, alias_name in normalized.items()}
+
+    def resolve(self, name):
+        """Return the catalog pest for ``name``, adding it if it was never seen."""
+        return self.resolve_many([name])[name]
+
+    def _add(self, name, alias_name):
+        try:
+            with transaction.atomic(using=self.db):
+                pest, _ = self.get_or_create(name=name)
+                PestAlias.objects.create(pest=pest, name=alias_name)
+        except IntegrityError:
+            pest = PestAlias.objects.select_related('pest').get(name=alias_name).pest
+        return pest
+
+
+class Pest(models.Model):
+    """Catalog entry every spelling of a pest name resolves to."""
+    name = models.CharField(max_length=255, unique=True)
+
+    objects = PestManager()
+
+    def __str__(self):
+        return self.name
+
+
+class PestAlias(models.Model):
+    """Normalized spelling (see ``normalize_pest_name``) that names a pest."""
+    pest = models.ForeignKey(Pest, on_delete=models.CASCADE, related_name="aliases")
+    name = models.CharField(max_length=255, unique=True)
+
     def __str__(self):
-        return f"Rating {self.rating} for {self.technician.get_full_name()} by {self.creator.get_full_name()}"
+        return f"{self.name} -> {self.pest.name}"
+
+
+class RegisterManager(models.Manager):
+    def create_register(self, owner, pest_name, image=None):
+        """Create a register and count it in the owner's daily rollup."""
+        pest = Pest.objects.resolve(pest_name)
+        with transaction.atomic(using=self.db):
+            register = self.create(owner=owner, pest_name=pest_name, pest=pest, image=image)
+            RegisterDailyCount.objects.add(owner.pk, timezone.localdate(register.created), pest.pk)
+            User.objects.filter(pk=owner.pk).update(registers_count=models.F('registers_count') + 1)
+            bump_version('user', owner.pk)
+        return register
+
+    def bulk_create_registers(self, registers):
+        """Insert unsaved registers in one statement and count them in the rollup.
+
+        Each register keeps the ``created`` timestamp it was built with.
+        """
+        pests = Pest.objects.resolve_many({register.pest_name for register in registers})
+        for register in registers:
+            register.pest = pests[register.pest_name]
+
+        owner_ids = {register.owner_id for register in registers}
+        with transaction.atomic(using=self.db):
+            last_pk = self.aggregate(last=models.Max('pk'))['last'] or 0
+            registers = self.bulk_create(registers)
+            if registers and registers[0].pk is None:
+                self._fill_bulk_pks(registers, owner_ids, last_pk)
+            for register in registers:
+                if register.image:
+                    schedule_renditions(register.image.name, 'pest')
+            buckets = Counter(
+                (register.owner_id, timezone.localdate(register.created), register.pest_id)
+                for register in registers
+            )
+            for (owner_id, date, pest_id), amount in buckets.items():
+                RegisterDailyCount.objects.add(owner_id, date, pest_id, amount)
+            for owner_id, amount in Counter(register.owner_id for register in registers).items():
+                User.objects.filter(pk=owner_id).update(registers_count=models.F('registers_count') + amount)
+                bump_version('user', owner_id)
+        return registers
+
+    def _fill_bulk_pks(self, registers, owner_ids, last_pk):
+        """Set the keys MySQL and SQLite do not return from bulk inserts.
+
+        The new rows are the owners' rows past ``last_pk``; rows with the same
+        owner, timestamp and pest name were inserted in list order.
+        """
+        pending = defaultdict(deque)
+        for register in registers:
+            pending[register.owner_id, register.created, register.pest_name].append(register)
+        rows = (
+            self.filter(owner_id__in=owner_ids, pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'owner_id', 'created', 'pest_name')
+        )
+        for pk, *key in rows:
+            waiting = pending.get(tuple(key))
+            if waiting:
+                waiting.popleft().pk = pk
 
 
 class Register(models.Model):
     pest_name = models.CharField(max_length=255)
+    pest = models.ForeignKey(Pest, null=True, on_delete=models.PROTECT, related_name="registers")
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="registers")
     image = models.ImageField(null=True, upload_to=pest_image_file_path)
-    created = models.DateTimeField(auto_now_add=True)
+    created = models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = RegisterManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'created', 'id'], name='register_owner_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.pest_name} ({self.owner.get_full_name()})"
-    
+
+
+class RegisterArchive(models.Model):
+    """
+    A register moved out of the hot table by ``archive_registers``.
+
+    Rows keep their Register id, so links to them stay valid; they still
+    count in RegisterDailyCount.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    pest_name = models.CharField(max_length=255)
+    pest = models.ForeignKey(Pest, null=True, on_delete=models.PROTECT, related_name="archived_registers")
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_registers")
+    image = models.ImageField(null=True, upload_to=pest_image_file_path)
+    created = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'created', 'id'], name='archive_owner_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.pest_name} ({self.owner.get_full_name()})"
+
+
+class RegisterDailyCountManager(models.Manager):
+    def add(self, owner_id, date, pest_id, amount=1):
+        """Add ``amount`` (which may be negative) to the owner's bucket for ``date`` and pest."""
+        bump_version('register-owner', owner_id)
+        bucket = self.filter(owner_id=owner_id, date=date, pest_id=pest_id)
+        changes = {'count': models.F('count') + amount, 'updated': timezone.now()}
+        if bucket.update(**changes) or amount < 0:
+            return
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(owner_id=owner_id, date=date, pest_id=pest_id, count=amount)
+        except IntegrityError:
+            bucket.update(**changes)
+
+
+class RegisterDailyCount(models.Model):
+    """Number of registers of a pest an owner created on a given day."""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="register_daily_counts")
+    date = models.DateField()
+    pest = models.ForeignKey(Pest, null=True, on_delete=models.PROTECT, related_name="daily_counts")
+    count = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = RegisterDailyCountManager()
+
+    class Meta:
+        unique_together = ('owner', 'date', 'pest')
+
+    def __str__(self):
+        return f"{self.owner_id} {self.date} {self.pest_id}: {self.count}"
+
+
+class UploadSession(models.Model):
+    """
+    A resumable, chunked upload of a register photo (see core.uploads).
+
+    Received bytes are appended to a partial file until ``received_bytes``
+    reaches ``total_size``; finalizing checks ``checksum`` (SHA-256 of the
+    whole file) and turns the upload into a Register.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+    pest_name = models.CharField(max_length=255)
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    checksum = models.CharField(max_length=64)
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size})"
+
+
 class WorkRequest(models.Model):
     STATUS_CHOICES = [
         ('send', 'Send'),
@@ -160,5 +541,10 @@ class WorkRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['technician', 'status'], name='workrequest_tech_status_idx'),
+        ]
+
     def __str__(self):
         return f"Request from {self.owner.get_full_name()} to {self.technician.get_full_name()} - Status: {self.status}"
\ No newline at end of file
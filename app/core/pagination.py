@@ -0,0 +1,119 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+"""
+import base64
+import binascii
+import json
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate by seeking past the last row of the previous page.
+
+    Rows are ordered by ``ordering``, whose last field must be unique, and
+    the opaque cursor carries that row's ordering values, so every page is
+    the same index range scan no matter how deep into the table it is.
+    Unless ``always`` is set, pagination is only applied when the client
+    sends ``cursor`` or ``page_size``; otherwise ``paginate_queryset``
+    returns ``None``.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def __init__(self, ordering=('-created', '-id'), always=False):
+        self.ordering = ordering
+        self.always = always
+        self.next_cursor = None
+        self.request = None
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.KEYSET_PAGE_SIZE
+        if page_size < 1:
+            return settings.KEYSET_PAGE_SIZE
+        return min(page_size, settings.KEYSET_MAX_PAGE_SIZE)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not (self.always or self.is_requested(request)):
+            return None
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        keys = [self._parse_key(queryset.model, key) for key in self.ordering]
+
+        queryset = queryset.order_by(*self.ordering)
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            queryset = queryset.filter(self._seek(keys, self.decode_cursor(keys, encoded)))
+
+        rows = list(queryset[:page_size + 1])
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_cursor = self.encode_cursor(keys, rows[-1])
+        else:
+            self.next_cursor = None
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def encode_cursor(self, keys, row):
+        if isinstance(row, dict):
+            # A .values() row: expose its columns as attributes.
+            row = SimpleNamespace(**row)
+        values = [field.value_to_string(row) for field, _ in keys]
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, keys, encoded):
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(keys):
+                raise ValueError
+            return [field.to_python(value) for (field, _), value in zip(keys, values)]
+        except (binascii.Error, ValueError, TypeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _parse_key(model, key):
+        descending = key.startswith('-')
+        name = key.lstrip('-')
+        field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        return field, descending
+
+    @staticmethod
+    def _seek(keys, values):
+        """Build ``(a, b, ...) > (x, y, ...)`` honouring each key's direction."""
+        condition = Q()
+        for index, (field, descending) in enumerate(keys):
+            lookup = 'lt' if descending else 'gt'
+            clause = {keys[i][0].attname: values[i] for i in range(index)}
+            clause[f'{field.attname}__{lookup}'] = values[index]
+            condition |= Q(**clause)
+        return condition
@@ -0,0 +1,83 @@
+"""
+Resized renditions (thumbnails) of uploaded pest and user images.
+
+Renditions are JPEGs stored next to the original upload, named after it
+(``uploads/pest/<name>_list.jpg``), so their URLs can be derived from the
+original name without touching the database or the disk. They are written
+as is, even by storages that rename uploads (see ``save_derivative``).
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def rendition_name(name, rendition):
+    """Return the storage name of ``rendition`` for the original ``name``."""
+    root = os.path.splitext(name)[0]
+    return f'{root}_{rendition}.jpg'
+
+
+def rendition_urls(image, kind):
+    """Return a mapping of rendition to URL for an image field value or stored name."""
+    if not image:
+        return None
+    name = getattr(image, 'name', image)
+    storage = getattr(image, 'storage', default_storage)
+    return {
+        rendition: storage.url(rendition_name(name, rendition))
+        for rendition in settings.IMAGE_RENDITIONS[kind]
+    }
+
+
+def generate_renditions(name, kind, storage=default_storage):
+    """Create every missing rendition of the stored image ``name``."""
+    sizes = {
+        rendition: size
+        for rendition, size in settings.IMAGE_RENDITIONS[kind].items()
+        if not storage.exists(rendition_name(name, rendition))
+    }
+    if not sizes:
+        return
+
+    with storage.open(name, 'rb') as original:
+        image = Image.open(original)
+        largest = max(sizes.values())
+        image.draft('RGB', largest)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    save = getattr(storage, 'save_derivative', storage.save)
+    for rendition, size in sizes.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, 'JPEG', quality=settings.IMAGE_RENDITION_QUALITY, optimize=True)
+        save(rendition_name(name, rendition), ContentFile(buffer.getvalue()))
+
+
+def _generate_safely(name, kind):
+    try:
+        generate_renditions(name, kind)
+    except Exception:
+        logger.exception('Could not generate %s renditions for %s', kind, name)
+
+
+def schedule_renditions(name, kind):
+    """Generate renditions in the worker pool once the transaction commits."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_RENDITION_WORKERS,
+            thread_name_prefix='renditions',
+        )
+    transaction.on_commit(lambda: _executor.submit(_generate_safely, name, kind))
@@ -0,0 +1,89 @@
+"""
+Primary / read-replica database routing.
+
+Safe (GET, HEAD, OPTIONS) requests read from the ``replica`` alias when one
+is configured; everything else, and any query outside a request, uses
+``default``. A user who writes is pinned to the primary for
+``settings.DB_REPLICA_PIN_SECONDS`` so they always read their own writes
+despite replication lag.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+REPLICA_DB_ALIAS = 'replica'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def _pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+def _token_user_id(request):
+    """Return the user id claimed by the request's access token, if any."""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    try:
+        return authentication.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+    except InvalidToken:
+        return None
+
+
+class PrimaryReplicaRouter:
+    """Send reads to the replica while the current request allows it."""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DB_ALIAS
+
+
+class PrimaryReplicaMiddleware(MiddlewareMixin):
+    """Decide per request whether reads may go to the replica."""
+
+    def process_request(self, request):
+        if not replica_configured():
+            return
+        request.token_user_id = _token_user_id(request)
+        pinned = request.token_user_id is not None and cache.get(_pin_key(request.token_user_id))
+        _use_replica.set(request.method in SAFE_METHODS and not pinned)
+
+    def process_response(self, request, response):
+        if not replica_configured():
+            return response
+        user_id = getattr(request, 'token_user_id', None)
+        if request.method not in SAFE_METHODS and user_id is not None:
+            cache.set(_pin_key(user_id), True, settings.DB_REPLICA_PIN_SECONDS)
+        if not response.streaming:
+            # Streaming responses read while being sent; the next request
+            # sets its own routing anyway.
+            _use_replica.set(False)
+        return response
@@ -0,0 +1,157 @@
+"""
+In-process n-gram index for type-ahead user search.
+
+Every worker keeps an index of the users' names, email, branch and company:
+each word contributes its one and two character prefixes and its trigrams.
+A query word is looked up by intersecting the sets of its grams, so a
+keystroke costs a few set operations instead of a ``LIKE '%...%'`` scan.
+
+The index follows the database through the ``user-search`` version token
+(see ``core.cache``): user saves bump it, and the next search re-reads the
+users changed since the last sync through the ``updated_at`` index. A
+worker also re-reads them once ``settings.USER_SEARCH_RESYNC_SECONDS`` have
+passed since its last sync, so a lost bump, or a write that made none,
+only leaves its index stale for that long.
+Callers must still load the returned users from the database, which drops
+anyone deleted or deactivated in the meantime.
+"""
+import datetime
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from core.cache import get_versions
+from core.models import User
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'email', 'branch', 'company')
+
+# Rows saved just before a sync may commit after it; re-read them next time.
+SYNC_OVERLAP = datetime.timedelta(minutes=5)
+
+EXACT, PREFIX, SUBSTRING = 3, 2, 1
+
+
+def fold(text):
+    """Lowercase ``text`` and strip its accents."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def words(text):
+    return re.findall(r'\w+', fold(text))
+
+
+def grams(word):
+    """Return the index keys of a word: ``^`` prefixes of 1-2 chars and trigrams."""
+    keys = {'^' + word[:size] for size in (1, 2) if len(word) >= size}
+    keys.update(word[i:i + 3] for i in range(len(word) - 2))
+    return keys
+
+
+def match_score(word, tokens):
+    """Score how well a query word matches a user's words; 0 means no match."""
+    best = 0
+    for token in tokens:
+        if token == word:
+            return EXACT
+        if token.startswith(word):
+            best = PREFIX
+        elif best < SUBSTRING and word in token:
+            best = SUBSTRING
+    return best
+
+
+class UserSearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._synced = None
+        self._synced_at = None
+        # user id -> (words, is_technique, is_active, average rating)
+        self._docs = {}
+        self._postings = defaultdict(set)
+
+    def _put(self, pk, tokens, is_technique, is_active, rating):
+        previous = self._docs.get(pk)
+        if previous is not None:
+            for key in set().union(*map(grams, previous[0])):
+                self._postings[key].discard(pk)
+        self._docs[pk] = (tokens, is_technique, is_active, rating)
+        for key in set().union(*map(grams, tokens)):
+            self._postings[key].add(pk)
+
+    def _fresh(self, version):
+        return (
+            version == self._version
+            and time.monotonic() - self._synced_at < settings.USER_SEARCH_RESYNC_SECONDS
+        )
+
+    def sync(self):
+        """Load the users changed since the last sync, if any user was saved since or it is due."""
+        version = get_versions('user-search', ['all'])['all']
+        if self._fresh(version):
+            return
+        with self._lock:
+            if self._fresh(version):
+                return
+            started = time.monotonic()
+            # Read the primary: a lagging replica would record the new version without the rows.
+            users = User.objects.using(DEFAULT_DB_ALIAS)
+            if self._synced is not None:
+                users = users.filter(updated_at__gte=self._synced - SYNC_OVERLAP)
+            columns = ('pk', 'updated_at', 'is_technique', 'is_active', 'rating_sum', 'rating_count')
+            synced = self._synced
+            for row in users.values_list(*columns, *SEARCH_FIELDS).iterator():
+                pk, updated_at, is_technique, is_active, rating_sum, rating_count = row[:6]
+                tokens = tuple(dict.fromkeys(word for value in row[6:] for word in words(value)))
+                rating = rating_sum / rating_count if rating_count else 0
+                self._put(pk, tokens, is_technique, is_active, rating)
+                synced = max(synced or updated_at, updated_at)
+            self._synced = synced
+            self._synced_at = started
+            self._version = version
+
+    def search(self, query, limit, technicians=False, among=None):
+        """
+        Return the ids of the best ``limit`` users matching every word of ``query``.
+
+        Users are ranked by match quality (exact word, prefix, substring) and
+        then by average rating. ``technicians`` keeps active technicians only;
+        ``among`` restricts the results to a set of user ids.
+        """
+        query_words = words(query)
+        if not query_words:
+            return []
+        self.sync()
+
+        candidates = None
+        for word in query_words:
+            if len(word) < 3:
+                keys = ['^' + word]
+            else:
+                keys = [word[i:i + 3] for i in range(len(word) - 2)]
+            found = set.intersection(*(self._postings.get(key, set()) for key in keys))
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                return []
+        if among is not None:
+            candidates &= among
+
+        ranked = []
+        for pk in candidates:
+            tokens, is_technique, is_active, rating = self._docs[pk]
+            if technicians and not (is_technique and is_active):
+                continue
+            scores = [match_score(word, tokens) for word in query_words]
+            if all(scores):
+                ranked.append((-sum(scores), -rating, pk))
+        ranked.sort()
+        return [pk for _, _, pk in ranked[:limit]]
+
+
+user_index = UserSearchIndex()
@@ -0,0 +1,138 @@
+"""
+Signal handlers keeping derived data in sync with core models.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.cache import bump_version
+from core.models import OrganizationClosure, Rating, RatingStarCount, Register, RegisterDailyCount, User
+from core.renditions import schedule_renditions
+
+
+_keep_rollup = ContextVar('keep_rollup', default=False)
+
+
+@contextmanager
+def keep_rollup():
+    """Delete registers without taking them out of the rollup or counts (archival)."""
+    token = _keep_rollup.set(True)
+    try:
+        yield
+    finally:
+        _keep_rollup.reset(token)
+
+
+@receiver(post_delete, sender=Register)
+def remove_register_from_rollup(sender, instance, **kwargs):
+    """Take a deleted register out of its owner's daily rollup and register count."""
+    if _keep_rollup.get():
+        return
+    RegisterDailyCount.objects.add(
+        instance.owner_id, timezone.localdate(instance.created), instance.pest_id, -1
+    )
+    User.objects.filter(pk=instance.owner_id, registers_count__gt=0).update(
+        registers_count=F('registers_count') - 1
+    )
+    bump_version('user', instance.owner_id)
+
+
+@receiver(post_save, sender=Register)
+def render_register_image(sender, instance, created, **kwargs):
+    """Queue thumbnails for a newly uploaded pest image."""
+    if created and instance.image:
+        schedule_renditions(instance.image.name, 'pest')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_user_search(sender, instance, **kwargs):
+    """Make every worker's search index pick up the change (see core.search)."""
+    bump_version('user-search', 'all')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """Drop the copy of the user cached for authentication (see core.authentication)."""
+    bump_version('user', instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def remember_managed_users(sender, instance, **kwargs):
+    """Keep the users directly under a deleted user to rebuild their closure rows."""
+    instance._closure_children = list(
+        User.managers.through.objects.filter(from_user_id=instance.pk).values_list('to_user_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=User)
+def rebuild_managed_users_closure(sender, instance, **kwargs):
+    """Drop the closure rows that went through a deleted user."""
+    children = getattr(instance, '_closure_children', None)
+    if children:
+        OrganizationClosure.objects.rebuild_for(children)
+
+
+def _image_name(instance):
+    """The name of the user's image as loaded or assigned, '' if it has none."""
+    value = instance.__dict__.get('image')
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_init, sender=User)
+def remember_user_image(sender, instance, **kwargs):
+    # None when the image column was deferred: it is unknown, not empty.
+    instance._saved_image = _image_name(instance) if 'image' in instance.__dict__ else None
+
+
+@receiver(post_save, sender=User)
+def render_user_image(sender, instance, created, update_fields=None, **kwargs):
+    """Queue thumbnails when a user's image changed."""
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    # Every save of an existing user writes the image column, changed or not.
+    previous = None if created else instance._saved_image
+    instance._saved_image = _image_name(instance)
+    if instance.image and instance.image.name != previous:
+        schedule_renditions(instance.image.name, 'user')
+
+
+def _add_rating(technician_id, stars, amount):
+    """Add (or, with ``amount=-1``, remove) a rating from the technician's aggregates and histogram."""
+    RatingStarCount.objects.add(technician_id, stars, amount)
+    User.objects.filter(pk=technician_id).update(
+        rating_sum=F('rating_sum') + amount * stars,
+        rating_count=F('rating_count') + amount,
+        updated_at=timezone.now(),
+    )
+    bump_version('user', technician_id)
+    # The search index ranks technicians by rating.
+    bump_version('user-search', 'all')
+
+
+@receiver(pre_save, sender=Rating)
+def remember_previous_rating(sender, instance, **kwargs):
+    """Keep the stored rating of an edited Rating to move the aggregates by the difference."""
+    instance._previous = None
+    if instance.pk is not None:
+        instance._previous = Rating.objects.filter(pk=instance.pk).values_list('technician_id', 'rating').first()
+
+
+@receiver(post_save, sender=Rating)
+def add_rating_to_technician(sender, instance, **kwargs):
+    """Count a new or edited rating in the technician's aggregates and histogram."""
+    previous = getattr(instance, '_previous', None)
+    if previous is not None:
+        _add_rating(*previous, -1)
+    _add_rating(instance.technician_id, instance.rating, 1)
+
+
+@receiver(post_delete, sender=Rating)
+def remove_rating_from_technician(sender, instance, **kwargs):
+    """Take a deleted rating out of the technician's aggregates and histogram."""
+    _add_rating(instance.technician_id, instance.rating, -1)
@@ -0,0 +1,39 @@
+"""
+Content-addressed storage for uploaded media.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names uploads after the SHA-256 of their bytes.
+
+    The directory and extension chosen by ``upload_to`` are kept and the
+    file name becomes the digest, so identical uploads share one blob that
+    is written only once. Blobs nothing references any more are removed by
+    the ``collect_media_garbage`` command.
+    """
+
+    def content_name(self, name, content):
+        """Return the content-addressed name for ``content`` uploaded as ``name``."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, f'{digest.hexdigest()}{extension}')
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        if self.exists(name):
+            # Refresh the blob's age so a running garbage collection spares it.
+            os.utime(self.path(name))
+            return name
+        return super()._save(name, content)
+
+    def save_derivative(self, name, content):
+        """Store a file derived from a blob, such as a thumbnail, under ``name`` as is."""
+        return super()._save(name, content)
@@ -0,0 +1,18 @@
+from django.test import TestCase
+
+from core.management.commands.check_query_plans import hot_queries, plan_problems
+from core.models import User
+
+
+class HotQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='tech@example.com', password='secret-pass-1',
+            first_name='Tech', last_name='User', is_technique=True,
+        )
+
+    def test_hot_queries_use_indexes(self):
+        for label, queryset in hot_queries(self.user.pk):
+            with self.subTest(label):
+                self.assertEqual(plan_problems(queryset), [])
@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import User
+from core.routers import (
+    REPLICA_DB_ALIAS, PrimaryReplicaMiddleware, PrimaryReplicaRouter, _use_replica,
+)
+
+
+class PrimaryReplicaRoutingTests(TestCase):
+    databases = {'default', REPLICA_DB_ALIAS}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='tech@example.com', password='secret-pass-1',
+            first_name='Tech', last_name='User', is_technique=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = PrimaryReplicaMiddleware(lambda request: HttpResponse())
+        self.addCleanup(_use_replica.set, False)
+
+    def request(self, method, user=None):
+        headers = {}
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(user)}'
+        return getattr(self.factory, method)('/api/', **headers)
+
+    def start(self, request):
+        self.middleware.process_request(request)
+        return request
+
+    def read_alias(self):
+        """Where a read is routed outside the transaction TestCase wraps each test in."""
+        with mock.patch.object(connections[DEFAULT_DB_ALIAS], 'in_atomic_block', False):
+            return User.objects.all().db
+
+    def test_reads_outside_a_request_use_the_primary(self):
+        self.assertEqual(self.read_alias(), 'default')
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.start(self.request('get', self.user))
+        self.assertEqual(self.read_alias(), REPLICA_DB_ALIAS)
+
+    def test_unsafe_requests_read_from_the_primary(self):
+        self.start(self.request('post', self.user))
+        self.assertEqual(self.read_alias(), 'default')
+
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        self.start(self.request('get'))
+        self.assertEqual(User.objects.all().db, 'default')
+
+    def test_writes_go_to_the_primary(self):
+        self.start(self.request('get', self.user))
+        self.assertEqual(PrimaryReplicaRouter().db_for_write(User), 'default')
+        with self.assertNumQueries(1, using='default'), self.assertNumQueries(0, using=REPLICA_DB_ALIAS):
+            User.objects.filter(pk=self.user.pk).update(first_name='Changed')
+
+    def test_reads_after_a_write_are_pinned_to_the_primary(self):
+        write = self.start(self.request('post', self.user))
+        self.middleware.process_response(write, HttpResponse())
+
+        self.start(self.request('get', self.user))
+        self.assertEqual(self.read_alias(), 'default')
+
+        # Other callers still read from the replica.
+        self.start(self.request('get'))
+        self.assertEqual(self.read_alias(), REPLICA_DB_ALIAS)
+
+    def test_the_pin_expires(self):
+        write = self.start(self.request('post', self.user))
+        with self.settings(DB_REPLICA_PIN_SECONDS=0):
+            self.middleware.process_response(write, HttpResponse())
+
+        self.start(self.request('get', self.user))
+        self.assertEqual(self.read_alias(), REPLICA_DB_ALIAS)
+
+    def test_responses_reset_the_routing(self):
+        read = self.start(self.request('get'))
+        self.middleware.process_response(read, HttpResponse())
+        self.assertEqual(self.read_alias(), 'default')
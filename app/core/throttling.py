@@ -0,0 +1,71 @@
+"""
+Cache-backed request throttling with per-endpoint, per-role rates.
+"""
+import re
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+RATE_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class RoleRateThrottle(SimpleRateThrottle):
+    """
+    Sliding-window throttle keyed by endpoint scope and caller.
+
+    The rate is looked up in ``settings.THROTTLE_RATES[scope][role]`` where
+    the scope is the view's ``throttle_scope`` and the role is ``creator``,
+    ``technician``, ``manager`` or ``anon``; no entry means no limit. Request
+    history lives in the ``settings.THROTTLE_CACHE`` cache, so no database
+    query is spent on rate limiting. Rates may scale the period, e.g.
+    ``'1/10s'`` for one request every ten seconds.
+
+    Throttling runs before the view validates anything, so every request
+    that gets past it counts, including those later rejected with a 400.
+    That is deliberate for ``login``, where failed attempts must count;
+    clients of the other scopes should fix a rejected request rather than
+    retry it as is, and the budgets leave room for a few such mistakes.
+    """
+    cache_format = 'throttle_%(scope)s_%(ident)s'
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.cache = caches[settings.THROTTLE_CACHE]
+
+    def get_role(self, request):
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return 'anon'
+        if user.is_creator:
+            return 'creator'
+        if user.is_technique:
+            return 'technician'
+        return 'manager'
+
+    def allow_request(self, request, view):
+        self.scope = self.scope or getattr(view, 'throttle_scope', None)
+        self.rate = settings.THROTTLE_RATES.get(self.scope, {}).get(self.get_role(request))
+        if self.rate is None:
+            return True
+
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def parse_rate(self, rate):
+        if rate is None:
+            return (None, None)
+        num, period = rate.split('/')
+        match = re.match(r'(\d*)([smhd])', period)
+        if match is None:
+            raise ValueError(f'Invalid throttle rate: {rate!r}')
+        multiplier = int(match.group(1) or 1)
+        return (int(num), multiplier * RATE_PERIODS[match.group(2)])
+
+    def get_cache_key(self, request, view):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            ident = user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -0,0 +1,82 @@
+"""
+Server-side state of resumable register photo uploads.
+
+The bytes of an UploadSession are written to ``<UPLOAD_SESSION_ROOT>/<id>.part``
+in fixed-size chunks: chunk ``n`` starts at byte ``n * UPLOAD_CHUNK_SIZE``.
+Chunks must arrive in order, but resending one that was already stored is
+accepted, so a client can always resume from ``received_bytes``.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.utils import timezone
+
+CHUNK_READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunk or a finalize request does not fit the session state."""
+
+
+class ChecksumMismatch(UploadError):
+    """Received bytes do not match their declared SHA-256."""
+
+
+def part_path(session):
+    return os.path.join(settings.UPLOAD_SESSION_ROOT, f'{session.id}.part')
+
+
+def chunk_count(session):
+    return -(-session.total_size // settings.UPLOAD_CHUNK_SIZE)
+
+
+def write_chunk(session, index, data, checksum):
+    """
+    Store chunk ``index`` of a session locked for update.
+
+    ``checksum`` is the hex SHA-256 of ``data``. Returns True if new bytes
+    were stored, False if the chunk had already been received.
+    """
+    if hashlib.sha256(data).hexdigest() != checksum.lower():
+        raise ChecksumMismatch('Chunk checksum mismatch.')
+    if not 0 <= index < chunk_count(session):
+        raise UploadError(f'Chunk index must be between 0 and {chunk_count(session) - 1}.')
+
+    offset = index * settings.UPLOAD_CHUNK_SIZE
+    expected = min(settings.UPLOAD_CHUNK_SIZE, session.total_size - offset)
+    if len(data) != expected:
+        raise UploadError(f'Chunk {index} must be {expected} bytes.')
+    if offset + len(data) <= session.received_bytes:
+        return False
+    if offset != session.received_bytes:
+        raise UploadError(f'Expected chunk {session.received_bytes // settings.UPLOAD_CHUNK_SIZE}.')
+
+    os.makedirs(settings.UPLOAD_SESSION_ROOT, exist_ok=True)
+    with open(part_path(session), 'r+b' if offset else 'wb') as part:
+        part.seek(offset)
+        part.write(data)
+        part.truncate()
+
+    session.received_bytes = offset + len(data)
+    session.expires_at = timezone.now() + settings.UPLOAD_SESSION_TTL
+    session.save(update_fields=['received_bytes', 'expires_at'])
+    return True
+
+
+def file_checksum(session):
+    """Return the hex SHA-256 of the bytes received so far."""
+    digest = hashlib.sha256()
+    with open(part_path(session), 'rb') as part:
+        for block in iter(lambda: part.read(CHUNK_READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def discard(session):
+    """Delete the session and its partial file."""
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
@@ -1,20 +1,87 @@
+import re
+from operator import itemgetter
+
+from django.conf import settings
+from django.utils.timezone import now
 from rest_framework import serializers
-from core.models import Register
+from core.fieldsets import SparseFieldsetMixin, media_url
+from core.models import Register, UploadSession
+from core.renditions import rendition_urls
 
-class RegisterSerializer(serializers.ModelSerializer):
+class RegisterSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     owner = serializers.StringRelatedField(read_only=True)
+    image_thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = Register
-        fields = ['id', 'pest_name', 'created', 'owner', 'image']
-        read_only_fields = ['id', 'created', 'owner']
+        fields = ['id', 'pest_name', 'pest', 'created', 'owner', 'image', 'image_thumbnails']
+        read_only_fields = ['id', 'pest', 'created', 'owner']
+
+    def get_image_thumbnails(self, obj):
+        return rendition_urls(obj.image, 'pest')
 
     def create(self, validated_data):
         user = self.context['request'].user
-        return Register.objects.create(owner=user, **validated_data)
+        return Register.objects.create_register(owner=user, **validated_data)
+
+    @classmethod
+    def values_fields(cls, context):
+        created = serializers.DateTimeField()
+        return {
+            'id': (('id',), itemgetter('id')),
+            'pest_name': (('pest_name',), itemgetter('pest_name')),
+            'pest': (('pest',), itemgetter('pest')),
+            'created': (('created',), lambda row: created.to_representation(row['created'])),
+            'owner': (('owner__email',), itemgetter('owner__email')),
+            'image': (('image',), lambda row: media_url(row['image'], context)),
+            'image_thumbnails': (('image',), lambda row: rendition_urls(row['image'], 'pest')),
+        }
     
 class RegisterImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to Register"""
 
     class Meta(RegisterSerializer.Meta):
-        fields = RegisterSerializer.Meta.fields + ['image']
\ No newline at end of file
+        fields = RegisterSerializer.Meta.fields + ['image']
+
+
+class RegisterBatchItemSerializer(serializers.ModelSerializer):
+    """Serializer for one register of an offline batch upload."""
+    created = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = Register
+        fields = ['pest_name', 'created', 'image']
+
+    def validate_created(self, value):
+        """Keep the device timestamp, but never one from the future."""
+        return min(value, now())
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for starting and resuming a chunked photo upload."""
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'pest_name', 'filename', 'total_size', 'checksum', 'chunk_size', 'received_bytes', 'expires_at']
+        read_only_fields = ['id', 'received_bytes', 'expires_at']
+
+    def get_chunk_size(self, obj):
+        return settings.UPLOAD_CHUNK_SIZE
+
+    def validate_total_size(self, value):
+        if not 0 < value <= settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'Must be between 1 and {settings.UPLOAD_MAX_SIZE} bytes.')
+        return value
+
+    def validate_checksum(self, value):
+        if not re.fullmatch(r'[0-9a-fA-F]{64}', value):
+            raise serializers.ValidationError('Must be the hex SHA-256 of the whole file.')
+        return value.lower()
+
+    def create(self, validated_data):
+        return UploadSession.objects.create(
+            owner=self.context['request'].user,
+            expires_at=now() + settings.UPLOAD_SESSION_TTL,
+            **validated_data
+        )
@@ -1,10 +1,18 @@
 from django.urls import path
-from .views import PestRegisterCreateViewSet, GetRegistersViewSet, GetRegisterDetailView, LastSevenDaysRegistersAPIView,TechnicianRegistersAPIView
+from .views import pest_register_upload, PestRegisterCreateViewSet, PestRegisterBatchCreateView, UploadSessionCreateView, UploadSessionView, UploadChunkView, UploadSessionCompleteView, ExportRegistersView, RegisterAnalyticsView, GetRegistersViewSet, GetRegisterDetailView, LastSevenDaysRegistersAPIView,TechnicianRegistersAPIView
 
 urlpatterns = [
     path('pest-register/', PestRegisterCreateViewSet.as_view(), name='pest-register'),
+    path('pest-register/upload/', pest_register_upload, name='pest-register-upload'),
+    path('pest-register/batch/', PestRegisterBatchCreateView.as_view(), name='pest-register-batch'),
+    path('uploads/', UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('uploads/<uuid:pk>/', UploadSessionView.as_view(), name='upload-session'),
+    path('uploads/<uuid:pk>/chunks/<int:index>/', UploadChunkView.as_view(), name='upload-chunk'),
+    path('uploads/<uuid:pk>/complete/', UploadSessionCompleteView.as_view(), name='upload-session-complete'),
     path('get-registers/', GetRegistersViewSet.as_view(), name='get-registers'),
     path('get-register/<int:pk>/', GetRegisterDetailView.as_view(), name='get-register'),
     path('get-last-seven-days-registers/', LastSevenDaysRegistersAPIView.as_view(), name='get-register'),
+    path('export/', ExportRegistersView.as_view(), name='export-registers'),
+    path('analytics/', RegisterAnalyticsView.as_view(), name='register-analytics'),
     path('get-technician-registers/', TechnicianRegistersAPIView.as_view(), name='get-technician-registers'),
 ]
@@ -1,23 +1,44 @@
 '''
 Views for registers.
 '''
-from core.models import Register
+import json
+
+import pytz
+from asgiref.sync import sync_to_async
+from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from core.authentication import CachedJWTAuthentication
+from core.analytics import GRANULARITIES, GROUPINGS, bucket_axis, time_series
+from core.cache import get_versions
+from core.conditional import conditional_get
+from core.fieldsets import requested_fields, serialize_list
+from core.exports import EXPORT_FORMATS, export_lines, filter_by_pest, filter_registers, parse_bound
+from core.models import Register, RegisterArchive, RegisterDailyCount, UploadSession, normalize_pest_name, pest_image_file_path
+from core.pagination import KeysetPagination
+from core.throttling import RoleRateThrottle
+from core.uploads import ChecksumMismatch, UploadError, discard, file_checksum, part_path, write_chunk
 from rest_framework.views import APIView
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
-from .serializers import RegisterSerializer
+from .serializers import RegisterBatchItemSerializer, RegisterSerializer, UploadSessionSerializer
 
-from django.utils.timezone import now
+from django.utils.timezone import localdate
 from datetime import timedelta
-from rest_framework.exceptions import ValidationError
-import datetime
-from django.db.models.functions import TruncDate
-from django.db.models import Count
+from django.db.models import Count, Max, Sum
 
 class PestRegisterCreateViewSet(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [RoleRateThrottle]
+    throttle_scope = 'pest-register'
 
     def post(self, request, *args, **kwargs):
         user = request.user
@@ -27,16 +48,7 @@ class PestRegisterCreateViewSet(APIView):
         if not pest_name:
             raise ValidationError({'pest_name': 'This field is required.'})
 
-        ten_seconds_ago = now() - timedelta(seconds=10)
-        recent_register = Register.objects.filter(owner=user, created__gte=ten_seconds_ago).exists()
-
-        if recent_register:
-            return Response(
-                {"message": "You can only register a pest every 10 seconds."},
-                status=status.HTTP_429_TOO_MANY_REQUESTS
-            )
-        
-        register = Register.objects.create(
+        register = Register.objects.create_register(
             pest_name=pest_name,
             owner=user,
             image=image
@@ -56,64 +68,475 @@ class PestRegisterCreateViewSet(APIView):
         )
 
 
+def _authenticate(request):
+    """
+    Authenticate the bearer token and apply the pest-register throttle.
+
+    Returns the user and, when throttled, the seconds until the next
+    request is allowed.
+    """
+    result = CachedJWTAuthentication().authenticate(request)
+    if result is None:
+        return None, None
+    request.user = result[0]
+    throttle = RoleRateThrottle(scope='pest-register')
+    if throttle.allow_request(request, None):
+        return request.user, None
+    # wait() is None when the window holds more requests than the rate allows.
+    return request.user, throttle.wait() or 0
+
+
+def _clean_upload(request):
+    """Parse the multipart body and validate the uploaded image, if any."""
+    image = request.FILES.get('image')
+    if image is not None:
+        forms.ImageField().clean(image)
+    return request.POST.get('pest_name'), image
+
+
+async def pest_register_upload(request):
+    """
+    Async twin of ``PestRegisterCreateViewSet`` for slow image uploads.
+
+    Under ASGI the request body is spooled to a temporary file before the
+    view runs, without holding a worker thread; parsing, the media write and
+    the database work are then offloaded to threads, so slow clients only
+    cost the event loop a pending coroutine.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
+    try:
+        user, wait = await sync_to_async(_authenticate)(request)
+    except APIException as exc:
+        detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+        return JsonResponse(detail, status=exc.status_code)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    if wait is not None:
+        retry_after = str(int(wait) + 1)
+        response = JsonResponse(
+            {'detail': f'Request was throttled. Expected available in {retry_after} seconds.'},
+            status=429
+        )
+        response['Retry-After'] = retry_after
+        return response
+
+    try:
+        pest_name, image = await sync_to_async(_clean_upload, thread_sensitive=False)(request)
+    except DjangoValidationError as exc:
+        return JsonResponse({'image': exc.messages}, status=400)
+    if not pest_name:
+        return JsonResponse({'pest_name': 'This field is required.'}, status=400)
+
+    if image is not None:
+        image = await sync_to_async(default_storage.save, thread_sensitive=False)(
+            pest_image_file_path(None, image.name), image
+        )
+
+    register = await sync_to_async(Register.objects.create_register)(
+        pest_name=pest_name,
+        owner=user,
+        image=image
+    )
+
+    return JsonResponse(
+        {
+            "message": "Pest register created successfully",
+            "data": {
+                "id": register.id,
+                "pest_name": register.pest_name,
+                "owner": user.get_full_name(),
+                "created": register.created,
+            },
+        },
+        status=201
+    )
+
+
+# Authentication is by bearer token only, as for the APIViews.
+pest_register_upload.csrf_exempt = True
+
+
+class PestRegisterBatchCreateView(APIView):
+    """
+    Create the registers an offline device queued up, in one transaction.
+
+    Accepts a JSON list (or ``{"registers": [...]}``) of ``pest_name``,
+    optional ``created`` and optional ``image``. Multipart requests send the
+    list as a JSON string in ``registers`` and each item's ``image`` names
+    the uploaded file field holding its photo. The response holds one result
+    per item, in order, with the ``id`` of the register it created.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [RoleRateThrottle]
+    throttle_scope = 'pest-register-batch'
+
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get('registers')
+        elif not isinstance(items, list):
+            raise ValidationError({'registers': 'A non-empty list is required.'})
+        if isinstance(items, str):
+            try:
+                items = json.loads(items)
+            except ValueError:
+                raise ValidationError({'registers': 'Must be a JSON list.'})
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'registers': 'A non-empty list is required.'})
+        if len(items) > settings.REGISTER_BATCH_MAX_SIZE:
+            raise ValidationError(
+                {'registers': f'At most {settings.REGISTER_BATCH_MAX_SIZE} registers per batch.'}
+            )
+
+        results = [None] * len(items)
+        registers = []
+        for index, item in enumerate(items):
+            if isinstance(item, dict) and isinstance(item.get('image'), str):
+                upload = request.FILES.get(item['image'])
+                if upload is None:
+                    errors = {'image': [f"No uploaded file named '{item['image']}'."]}
+                    results[index] = {'index': index, 'status': 'invalid', 'errors': errors}
+                    continue
+                item = dict(item, image=upload)
+
+            serializer = RegisterBatchItemSerializer(data=item)
+            if serializer.is_valid():
+                registers.append((index, Register(owner=request.user, **serializer.validated_data)))
+            else:
+                results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+
+        Register.objects.bulk_create_registers([register for _, register in registers])
+
+        for index, register in registers:
+            results[index] = {
+                'index': index,
+                'status': 'created',
+                'id': register.pk,
+                'pest_name': register.pest_name,
+                'created': register.created,
+            }
+
+        if not registers:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(registers) < len(items):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+
+        return Response(
+            {
+                "message": f"{len(registers)} of {len(items)} pest registers created",
+                "results": results,
+            },
+            status=response_status
+        )
+
+
+def _live_session(request, pk, lock=False):
+    """Return the caller's unexpired upload session ``pk`` or None."""
+    sessions = UploadSession.objects.filter(pk=pk, owner=request.user, expires_at__gt=timezone.now())
+    if lock:
+        sessions = sessions.select_for_update()
+    return sessions.first()
+
+
+class UploadSessionCreateView(APIView):
+    """
+    Start a resumable photo upload for a new register.
+
+    Takes ``pest_name``, ``filename``, ``total_size`` and ``checksum`` (hex
+    SHA-256 of the whole file); the response holds the session ``id`` and
+    the ``chunk_size`` to send the file in.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = UploadSessionSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    """Show how far an upload got (to resume it) or abandon it."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        session = _live_session(request, pk)
+        if session is None:
+            return Response({'detail': 'Upload not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+
+    def delete(self, request, pk):
+        session = _live_session(request, pk)
+        if session is None:
+            return Response({'detail': 'Upload not found.'}, status=status.HTTP_404_NOT_FOUND)
+        discard(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadChunkView(APIView):
+    """
+    Store chunk ``index`` of an upload.
+
+    The body holds the raw chunk bytes and the ``X-Chunk-Checksum`` header
+    its hex SHA-256. Resending a stored chunk is harmless; an out-of-order
+    chunk gets a 409 with the ``received_bytes`` to resume from.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, pk, index):
+        checksum = request.headers.get('X-Chunk-Checksum')
+        if not checksum:
+            raise ValidationError({'detail': 'The X-Chunk-Checksum header is required.'})
+
+        with transaction.atomic():
+            session = _live_session(request, pk, lock=True)
+            if session is None:
+                return Response({'detail': 'Upload not found.'}, status=status.HTTP_404_NOT_FOUND)
+            try:
+                write_chunk(session, index, request.body, checksum)
+            except UploadError as e:
+                return Response(
+                    {'detail': str(e), 'received_bytes': session.received_bytes},
+                    status=status.HTTP_400_BAD_REQUEST if isinstance(e, ChecksumMismatch) else status.HTTP_409_CONFLICT
+                )
+
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+
+
+class UploadSessionCompleteView(APIView):
+    """Verify a fully received upload and create its register."""
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [RoleRateThrottle]
+    throttle_scope = 'pest-register'
+
+    def post(self, request, pk):
+        with transaction.atomic():
+            session = _live_session(request, pk, lock=True)
+            if session is None:
+                return Response({'detail': 'Upload not found.'}, status=status.HTTP_404_NOT_FOUND)
+            if session.received_bytes != session.total_size:
+                return Response(
+                    {'detail': 'Upload is incomplete.', 'received_bytes': session.received_bytes},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if file_checksum(session) != session.checksum:
+                discard(session)
+                return Response(
+                    {'checksum': 'The uploaded file does not match its checksum.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            with open(part_path(session), 'rb') as part:
+                image = File(part, name=session.filename)
+                try:
+                    forms.ImageField().clean(image)
+                except DjangoValidationError as e:
+                    discard(session)
+                    return Response({'image': e.messages}, status=status.HTTP_400_BAD_REQUEST)
+                name = default_storage.save(pest_image_file_path(None, session.filename), image)
+
+            register = Register.objects.create_register(
+                pest_name=session.pest_name,
+                owner=request.user,
+                image=name
+            )
+            discard(session)
+
+        return Response(
+            {
+                "message": "Pest register created successfully",
+                "data": {
+                    "id": register.id,
+                    "pest_name": register.pest_name,
+                    "owner": request.user.get_full_name(),
+                    "created": register.created,
+                },
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+
+def registers_state(view, request):
+    """Validators for the register list: newest register and how many there are."""
+    state = Register.objects.filter(owner=request.user).aggregate(latest=Max('created'), count=Count('id'))
+    # No Last-Modified: deletions and backdated batch inserts leave Max('created') as is.
+    return (state['latest'], state['count']), None
+
+
+def register_state(view, request, pk):
+    """Validators for one register: registers never change once created."""
+    state = (
+        Register.objects.filter(pk=pk, owner=request.user).values_list('created', 'pest_id', 'image').first()
+        or RegisterArchive.objects.filter(pk=pk, owner=request.user).values_list('created', 'pest_id', 'image').first()
+    )
+    return state, state[0] if state else None
+
+
+def chart_state(view, request):
+    """Validators for the 7-day chart: the rollup buckets in the window."""
+    last_seven_days = localdate() - timedelta(days=7)
+    state = RegisterDailyCount.objects.filter(
+        owner__in=request.user.register_owners(),
+        date__gte=last_seven_days
+    ).aggregate(updated=Max('updated'), total=Sum('count'), buckets=Count('id'))
+    # No Last-Modified: Max('updated') does not move when an owner leaves the set.
+    return (last_seven_days, state['updated'], state['total'], state['buckets']), None
+
+
 class GetRegistersViewSet(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(registers_state)
     def get(self, request):
         """
         Obtener todos los registros del usuario autenticado.
         """
         user = request.user
-        registers = Register.objects.filter(owner=user)
-        serializer = RegisterSerializer(registers, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        registers = filter_by_pest(Register.objects.filter(owner=user), request.query_params.get('pest'))
+
+        paginator = KeysetPagination()
+        data, paginated = serialize_list(RegisterSerializer, registers, request, paginator)
+        if paginated:
+            return paginator.get_paginated_response(data)
+        return Response(data, status=status.HTTP_200_OK)
 
 class GetRegisterDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(register_state)
     def get(self, request, pk):
         """
         Obtener un registro específico basado en su PK.
+        Los registros archivados se buscan en RegisterArchive.
         """
-        try:
-            register = Register.objects.get(pk=pk, owner=request.user)
-            serializer = RegisterSerializer(register)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Register.DoesNotExist:
+        register = (
+            Register.objects.filter(pk=pk, owner=request.user).first()
+            or RegisterArchive.objects.filter(pk=pk, owner=request.user).first()
+        )
+        if register is None:
             return Response({'detail': 'Registro no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
-        
+        serializer = RegisterSerializer(register, context={'fields': requested_fields(request, RegisterSerializer)})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class ExportRegistersView(APIView):
+    """
+    Stream every register the user can see as CSV or NDJSON.
+
+    Creators export the registers of all their managers. Filters:
+    ``output`` (``csv`` or ``ndjson``), ``start``/``end`` (ISO dates or
+    datetimes) and ``pest``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        export_format = params.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'output': f"Must be one of: {', '.join(EXPORT_FORMATS)}."})
+
+        owners = request.user.register_owners()
+        try:
+            querysets = [
+                filter_registers(
+                    model.objects.filter(owner__in=owners),
+                    start=params.get('start'),
+                    end=params.get('end'),
+                    pest=params.get('pest'),
+                )
+                for model in (RegisterArchive, Register)
+            ]
+        except ValueError as e:
+            raise ValidationError({'detail': str(e)})
+
+        response = StreamingHttpResponse(
+            export_lines(querysets, export_format, settings.EXPORT_CHUNK_SIZE),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="registers.{export_format}"'
+        return response
+
+
+class RegisterAnalyticsView(APIView):
+    """
+    Register counts over time for every owner the user can see.
+
+    Parameters: ``granularity`` (hour, day, week or month), ``start`` and
+    ``end`` (ISO dates or datetimes, last 7 days by default), ``tz`` (time
+    zone the buckets follow), ``group_by`` (none, owner or pest), ``pest``
+    and ``owner``. Empty buckets are filled with zeros.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        granularity = params.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            raise ValidationError({'granularity': f"Must be one of: {', '.join(GRANULARITIES)}."})
+        group_by = params.get('group_by', 'none')
+        if group_by not in GROUPINGS:
+            raise ValidationError({'group_by': f"Must be one of: {', '.join(GROUPINGS)}."})
+        try:
+            tz = pytz.timezone(params.get('tz', settings.TIME_ZONE))
+        except pytz.UnknownTimeZoneError:
+            raise ValidationError({'tz': 'Unknown time zone.'})
+        owner = params.get('owner')
+        if owner:
+            try:
+                owner = int(owner)
+            except ValueError:
+                raise ValidationError({'owner': 'Must be a user id.'})
+
+        with timezone.override(tz):
+            try:
+                end = parse_bound(params['end'], end=True) if 'end' in params else timezone.now()
+                start = parse_bound(params['start']) if 'start' in params else end - timedelta(days=7)
+            except ValueError as e:
+                raise ValidationError({'detail': str(e)})
+        if start >= end:
+            raise ValidationError({'detail': 'start must be before end.'})
+        if len(bucket_axis(start, end, granularity, tz)) > settings.ANALYTICS_MAX_BUCKETS:
+            raise ValidationError({'detail': f'At most {settings.ANALYTICS_MAX_BUCKETS} buckets per request.'})
+
+        owners = request.user.register_owners()
+        if owner:
+            owners = owners.filter(pk=owner)
+        # Archived registers still count, as in the export and the daily rollup.
+        querysets = [
+            filter_by_pest(
+                model.objects.filter(owner__in=owners, created__gte=start, created__lt=end),
+                params.get('pest'),
+            )
+            for model in (RegisterArchive, Register)
+        ]
+
+        data = time_series(querysets, start, end, granularity, tz, group_by=group_by)
+        data.update({'granularity': granularity, 'timezone': tz.zone})
+        return Response(data)
+
 class LastSevenDaysRegistersAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(chart_state)
     def get(self, request):
         user = request.user
-        today = datetime.datetime.today()
-        last_seven_days = today - timedelta(days=7)
-
-        if user.is_creator:
-            data = (
-                Register.objects.filter(owner__in=user.managers.all(), created__gte=last_seven_days)
-                .annotate(date=TruncDate('created'))
-                .values('date')
-                .annotate(count=Count('id'))
-                .order_by('date')
-            )
-        elif user.is_technique:
-            data = (
-                Register.objects.filter(owner__in=user.managed_by.all(), created__gte=last_seven_days)
-                .annotate(date=TruncDate('created'))
-                .values('date')
-                .annotate(count=Count('id'))
-                .order_by('date')
-            )
-        else:
-            data = (
-                Register.objects.filter(owner=user, created__gte=last_seven_days)
-                .annotate(date=TruncDate('created'))
-                .values('date')
-                .annotate(count=Count('id'))
-                .order_by('date')
-            )
+        last_seven_days = localdate() - timedelta(days=7)
+
+        counts = RegisterDailyCount.objects.filter(
+            owner__in=user.register_owners(),
+            date__gte=last_seven_days,
+            count__gt=0
+        )
+        data = (
+            filter_by_pest(counts, request.query_params.get('pest'))
+            .values('date')
+            .annotate(count=Sum('count'))
+            .order_by('date')
+        )
 
         return Response(data)
 
@@ -125,39 +548,42 @@ class TechnicianRegistersAPIView(APIView):
         if not user.is_technique:
             return Response([])  # Solo los técnicos pueden acceder
 
-        today = datetime.datetime.today()
-        last_seven_days = today - timedelta(days=7)
+        last_seven_days = localdate() - timedelta(days=7)
 
-        # Registros asociados a los dueños gestionados por los managers del técnico
-        managed_owners = user.managed_by.all()
-        manager_registers = (
-            Register.objects.filter(
-                owner__in=managed_owners,
-                created__gte=last_seven_days
+        # Dueños gestionados por el técnico más los que tienen solicitudes en curso con él
+        owner_ids = sorted(
+            user.register_owners().values_list('pk', flat=True).union(
+                user.received_requests.filter(status='working').values_list('owner', flat=True)
             )
-            .annotate(date=TruncDate('created'))
-            .values('date', 'owner')
-            .annotate(count=Count('id'))
-            .order_by('date')
         )
 
-        # Registros asociados directamente al técnico (mediante solicitudes de trabajo)
-        work_requests_owners = user.received_requests.filter(status='working').values_list('owner', flat=True)
-        technician_registers = (
-            Register.objects.filter(
-                owner__in=work_requests_owners,
-                created__gte=last_seven_days
-            )
-            .annotate(date=TruncDate('created'))
+        # El resultado se reutiliza mientras ningún registro de esos dueños cambie
+        pest = request.query_params.get('pest', '')
+        cache_key = f'technician-registers:{user.pk}:{last_seven_days}:{normalize_pest_name(pest)}'
+        versions = get_versions('register-owner', owner_ids)
+        cached = cache.get(cache_key)
+        if cached is not None and cached['versions'] == versions:
+            return Response(cached['data'])
+
+        # Del primario: una réplica atrasada guardaría conteos viejos bajo las versiones nuevas
+        counts = RegisterDailyCount.objects.using(DEFAULT_DB_ALIAS).filter(
+            owner__in=owner_ids,
+            date__gte=last_seven_days,
+            count__gt=0
+        )
+        data = list(
+            filter_by_pest(counts, pest)
             .values('date', 'owner')
-            .annotate(count=Count('id'))
-            .order_by('date')
+            .annotate(count=Sum('count'))
+            .order_by('date', 'owner')
         )
 
-        # Combinar datos
-        combined_data = list(manager_registers) + list(technician_registers)
-
-        for entry in combined_data:
+        for entry in data:
             entry['user_id'] = entry['owner']
 
-        return Response(combined_data)
\ No newline at end of file
+        cache.set(
+            cache_key,
+            {'versions': versions, 'data': data},
+            settings.TECHNICIAN_REGISTERS_CACHE_TIMEOUT
+        )
+        return Response(data)